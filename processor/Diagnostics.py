@@ -0,0 +1,85 @@
+import json
+import sys
+from collections import Counter, namedtuple
+
+# position of input row, messages about input data carry it explicitly
+SourcePosition = namedtuple("SourcePosition", "file, sheet, row")
+Diagnostic = namedtuple("Diagnostic", "level, code, message, file, sheet, row, person")
+
+LEVEL_PREFIXES = {
+    'info': 'INFO: ',
+    'warning': 'WARNING: ',
+    'error': 'ERROR: ',
+}
+
+
+# Collects messages as structured records, they are written in batches by flush() as text or JSON lines.
+# The same message about the same position is reported only once.
+class Diagnostics:
+    def __init__(self):
+        self.output_format = 'text'
+        # messages of worker processes are not written, but returned to the main process
+        self.deferred = False
+        self.records = []
+        self.pending = []
+        self.seen = set()
+        self.repeated = Counter()
+        self.level_counts = Counter()
+
+    def add(self, level, message, code=None, position=None, person=None):
+        file, sheet, row = position if position is not None else (None, None, None)
+        record = Diagnostic(level, code, message, file, sheet, row, person)
+        if level != 'info':
+            if record in self.seen:
+                self.repeated[level] += 1
+                return
+            self.seen.add(record)
+        self.records.append(record)
+        self.pending.append(record)
+        self.level_counts[level] += 1
+
+    def add_records(self, records):
+        for r in records:
+            self.add(r.level, r.message, r.code, SourcePosition(r.file, r.sheet, r.row) if r.file else None, r.person)
+
+    def reset_seen(self):
+        # messages of next season are deduplicated separately, the same message can be reported again
+        self.seen = set()
+
+    def take_pending(self):
+        pending = self.pending
+        self.pending = []
+        return pending
+
+    def flush(self):
+        if not self.pending or self.deferred:
+            return
+        if self.output_format == 'json':
+            lines = [json.dumps(r._asdict(), ensure_ascii=False) for r in self.pending]
+        else:
+            lines = [self.format_text(r) for r in self.pending]
+        self.pending = []
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+
+    @staticmethod
+    def format_text(record):
+        if record.file:
+            return "%s%s @%s[%s]:%d" % (LEVEL_PREFIXES[record.level], record.message, record.file, record.sheet,
+                                        record.row)
+        return "%s%s" % (LEVEL_PREFIXES[record.level], record.message)
+
+    def count(self, level, code=None):
+        if code is None:
+            return self.level_counts[level]
+        return sum(1 for r in self.records if r.level == level and r.code == code)
+
+    def clear(self):
+        self.records = []
+        self.pending = []
+        self.seen = set()
+        self.repeated = Counter()
+        self.level_counts = Counter()
+
+
+diagnostics = Diagnostics()
@@ -0,0 +1,54 @@
+import difflib
+from functools import lru_cache
+
+# imported by set_backend, only if rapidfuzz backend is used
+Indel = None
+
+
+def get_name_variants(name):
+    # middle or first name of three part name can be skipped
+    parts = name.split()
+    if len(parts) == 3:
+        return [name, "%s %s" % (parts[0], parts[2]), "%s %s" % (parts[1], parts[2])]
+    return [name]
+
+
+def difflib_ratio(variants, name_b):
+    # b side of SequenceMatcher is indexed once for all variants
+    matcher = difflib.SequenceMatcher(b=name_b)
+    res = 0
+    for v in variants:
+        matcher.set_seq1(v)
+        res = max(res, matcher.ratio())
+    return res
+
+
+def rapidfuzz_ratio(variants, name_b):
+    # ratio based on longest common subsequence, it is never lower than the difflib one
+    return max(Indel.normalized_similarity(v, name_b) for v in variants)
+
+
+BACKENDS = {
+    'difflib': difflib_ratio,
+    'rapidfuzz': rapidfuzz_ratio,
+}
+
+backend = difflib_ratio
+
+
+def set_backend(name):
+    global backend, Indel
+    if name == 'rapidfuzz' and Indel is None:
+        try:
+            from rapidfuzz.distance import Indel
+        except ImportError:
+            raise ValueError("Name matching backend 'rapidfuzz' requires rapidfuzz package")
+    backend = BACKENDS[name]
+    get_names_matching_ratio.cache_clear()
+
+
+@lru_cache(maxsize=1 << 16)
+def get_names_matching_ratio(name_a, name_b):
+    if len(name_a.split()) < len(name_b.split()):
+        name_a, name_b = name_b, name_a
+    return backend(get_name_variants(name_a), name_b)
@@ -0,0 +1,204 @@
+import os
+
+from openpyxl import load_workbook
+from openpyxl.utils import range_boundaries
+
+from Diagnostics import diagnostics
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Table, TableStyle
+except ImportError:
+    pdfmetrics = None
+
+# (regular, bold, italic) fonts with Czech characters, font can be set also by PDF_FONT env var
+PDF_FONT_FALLBACK_PATHS = [
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+     '/usr/share/fonts/truetype/dejavu/DejaVuSans-Oblique.ttf'),
+    ('/usr/share/fonts/dejavu/DejaVuSans.ttf',
+     '/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf',
+     '/usr/share/fonts/dejavu/DejaVuSans-Oblique.ttf'),
+    (r'C:\Windows\Fonts\arial.ttf', r'C:\Windows\Fonts\arialbd.ttf', r'C:\Windows\Fonts\ariali.ttf'),
+    ('/System/Library/Fonts/Supplemental/Arial.ttf',
+     '/System/Library/Fonts/Supplemental/Arial Bold.ttf',
+     '/System/Library/Fonts/Supplemental/Arial Italic.ttf'),
+    ('/Library/Fonts/Arial.ttf', '/Library/Fonts/Arial Bold.ttf', '/Library/Fonts/Arial Italic.ttf'),
+]
+
+
+# Renders the same tables as ResultWriter directly to PDF (A4 landscape fitted to width), without LibreOffice.
+# Header of tables is taken from rows 4-7 of outputTemplate.xlsx and repeated on every page.
+class PdfWriter:
+    FIRST_HEADER_ROW = 4
+    FIRST_OUTPUT_WRITE_ROW = 8
+    FIRST_COLUMN = 2
+    LAST_COLUMN = 26
+    # relative widths of name, club and birth year columns, race columns have width 1
+    FIRST_COLUMN_WIDTHS = [4.2, 5.4, 1.3]
+    FONT_SIZE = 7
+    IGNORED_COLOR = '#808080'
+
+    def __init__(self, config, category_sum_results):
+        self.config = config
+        self.category_sum_results = category_sum_results
+        self.fonts = None
+        self.header = None
+        self.header_styles = None
+        self.data_backgrounds = None
+        self.title = None
+        self.url = None
+
+    def write(self, file_name):
+        if pdfmetrics is None:
+            diagnostics.add('warning', "'reportlab' package not found — skipping PDF export.", 'pdf-export')
+            return False
+
+        self.fonts = self.register_fonts()
+        self.load_template()
+
+        page_size = landscape(A4)
+        margin = 10 * mm
+        doc = SimpleDocTemplate(file_name, pagesize=page_size, leftMargin=margin, rightMargin=margin,
+                                topMargin=margin, bottomMargin=margin, title='VKCT %s' % self.config.year)
+        col_widths = self.get_column_widths(page_size[0] - 2 * margin)
+
+        story = []
+        for cat_results in self.category_sum_results:
+            if story:
+                story.append(PageBreak())
+            story.append(self.create_title(cat_results, col_widths))
+            story.append(self.create_table(cat_results, col_widths))
+        doc.build(story)
+        diagnostics.add('info', "PDF exported: %s" % file_name, 'output')
+        return True
+
+    def create_title(self, cat_results, col_widths):
+        regular, bold, italic = self.fonts
+        title_style = ParagraphStyle('title', fontName=bold, fontSize=14, leading=18)
+        category_style = ParagraphStyle('category', fontName=bold, fontSize=12, leading=16)
+        url_style = ParagraphStyle('url', fontName=regular, fontSize=9, alignment=TA_RIGHT)
+        table = Table([[Paragraph("%s %d" % (self.title, self.config.year), title_style), Paragraph(self.url, url_style)],
+                       [Paragraph(cat_results.category.get_title(), category_style), '']],
+                      colWidths=[sum(col_widths) / 2] * 2)
+        table.setStyle(TableStyle([('LEFTPADDING', (0, 0), (-1, -1), 0), ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+                                   ('BOTTOMPADDING', (0, 0), (-1, -1), 4)]))
+        return table
+
+    def create_table(self, cat_results, col_widths):
+        regular, bold, italic = self.fonts
+        # header texts are wrapped to the width of (merged) cells
+        header_style = ParagraphStyle('header', fontName=regular, fontSize=self.FONT_SIZE - 1,
+                                      leading=self.FONT_SIZE, alignment=TA_CENTER)
+        rows = [[Paragraph(v, header_style) if v else '' for v in r] for r in self.header]
+        styles = list(self.header_styles)
+        styles += [
+            ('FONTNAME', (0, 0), (-1, -1), regular),
+            ('FONTSIZE', (0, 0), (-1, -1), self.FONT_SIZE),
+            ('LEADING', (0, 0), (-1, -1), self.FONT_SIZE + 1),
+            ('ALIGN', (2, 0), (-1, -1), 'CENTER'),
+            ('ALIGN', (0, 0), (-1, len(rows) - 1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 1),
+            ('LEFTPADDING', (0, 0), (-1, -1), 2),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
+        ]
+
+        for pr in cat_results.personal_results:
+            row_idx = len(rows)
+            row = [''] * len(col_widths)
+            row[0] = pr.person.name
+            row[1] = pr.person.team or ''
+            row[2] = pr.person.birth_year if pr.person.birth_year is not None else ''
+            for i in range(len(pr.race_results)):
+                r = pr.race_results[i]
+                # columns of ResultWriter, first race has no sum columns
+                pos_col = 3 if i == 0 else 5 + (i - 1) * 4
+                if r.position is not None:
+                    row[pos_col] = r.position if not r.half_points else "%s*" % r.position
+                    row[pos_col + 1] = r.points
+                    # highlight ignored results
+                    if r.ignored_in_summary:
+                        styles.append(('FONTNAME', (pos_col + 1, row_idx), (pos_col + 1, row_idx), italic))
+                        styles.append(('TEXTCOLOR', (pos_col + 1, row_idx), (pos_col + 1, row_idx), self.IGNORED_COLOR))
+                if i > 0 and r.sum_points is not None:
+                    row[pos_col + 2] = r.sum_position
+                    row[pos_col + 3] = r.sum_points
+            rows.append(row)
+
+        if len(rows) > len(self.header):
+            for col, color in self.data_backgrounds:
+                styles.append(('BACKGROUND', (col, len(self.header)), (col, -1), color))
+
+        table = Table(rows, colWidths=col_widths, repeatRows=len(self.header))
+        table.setStyle(TableStyle(styles))
+        return table
+
+    def get_column_widths(self, page_width):
+        widths = self.FIRST_COLUMN_WIDTHS + [1] * (self.LAST_COLUMN - self.FIRST_COLUMN + 1 - len(self.FIRST_COLUMN_WIDTHS))
+        return [w * page_width / sum(widths) for w in widths]
+
+    def load_template(self):
+        wb = load_workbook('outputTemplate.xlsx')
+        ws = wb['Template']
+        self.title = ws.cell(row=2, column=self.FIRST_COLUMN).value
+        self.url = ws.cell(row=2, column=self.LAST_COLUMN).value or ''
+
+        self.header = []
+        self.header_styles = []
+        for row in range(self.FIRST_HEADER_ROW, self.FIRST_OUTPUT_WRITE_ROW):
+            values = []
+            for col in range(self.FIRST_COLUMN, self.LAST_COLUMN + 1):
+                cell = ws.cell(row=row, column=col)
+                values.append(str(cell.value).strip() if cell.value is not None else '')
+                color = self.get_fill_color(cell)
+                if color:
+                    pos = (col - self.FIRST_COLUMN, row - self.FIRST_HEADER_ROW)
+                    self.header_styles.append(('BACKGROUND', pos, pos, color))
+            self.header.append(values)
+
+        for merged in ws.merged_cells.ranges:
+            min_col, min_row, max_col, max_row = range_boundaries(str(merged))
+            if min_row >= self.FIRST_HEADER_ROW and max_row < self.FIRST_OUTPUT_WRITE_ROW:
+                self.header_styles.append(('SPAN', (min_col - self.FIRST_COLUMN, min_row - self.FIRST_HEADER_ROW),
+                                           (max_col - self.FIRST_COLUMN, max_row - self.FIRST_HEADER_ROW)))
+
+        self.data_backgrounds = []
+        for col in range(self.FIRST_COLUMN, self.LAST_COLUMN + 1):
+            color = self.get_fill_color(ws.cell(row=self.FIRST_OUTPUT_WRITE_ROW, column=col))
+            if color:
+                self.data_backgrounds.append((col - self.FIRST_COLUMN, color))
+        wb.close()
+
+    @staticmethod
+    def get_fill_color(cell):
+        rgb = cell.fill.fgColor.rgb
+        if cell.fill.fill_type != 'solid' or not isinstance(rgb, str) or len(rgb) != 8:
+            return None
+        return '#' + rgb[2:]
+
+    @staticmethod
+    def register_fonts():
+        env_font = os.environ.get("PDF_FONT")
+        candidates = [(env_font, env_font, env_font)] if env_font else []
+        for paths in candidates + PDF_FONT_FALLBACK_PATHS:
+            if not os.path.exists(paths[0]):
+                continue
+            names = []
+            for name, path in zip(('VKCT', 'VKCT-Bold', 'VKCT-Italic'), paths):
+                if name not in pdfmetrics.getRegisteredFontNames():
+                    pdfmetrics.registerFont(TTFont(name, path if os.path.exists(path) else paths[0]))
+                names.append(name)
+            return names
+
+        diagnostics.add('warning', "No TrueType font found, PDF may miss Czech characters. Set PDF_FONT env var.",
+                        'pdf-export')
+        return ['Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique']
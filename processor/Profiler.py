@@ -0,0 +1,108 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Wall time, CPU time, peak of traced memory and item counts of processing stages.
+# Stages can be nested, peak memory of a stage includes its nested stages.
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self.stack = []
+
+    def enable(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, **args):
+        # yields dict, to which the stage can add item counts
+        counts = dict()
+        if not self.enabled:
+            yield counts
+            return
+
+        self.update_parent_peak()
+        tracemalloc.reset_peak()
+        record = {'name': name, 'args': args, 'counts': counts, 'start': time.time(), 'peak': 0, 'tid': 0}
+        self.stack.append(record)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield counts
+        finally:
+            record['cpu'] = time.process_time() - cpu
+            record['wall'] = time.perf_counter() - wall
+            record['peak'] = max(record['peak'], tracemalloc.get_traced_memory()[1])
+            self.stack.pop()
+            self.records.append(record)
+            self.update_parent_peak(record['peak'])
+            tracemalloc.reset_peak()
+
+    def add(self, name, start, wall, cpu, tid, **args):
+        # stage measured elsewhere (in worker process), memory is not traced there
+        if self.enabled:
+            self.records.append({'name': name, 'args': args, 'counts': dict(), 'start': start, 'wall': wall,
+                                 'cpu': cpu, 'peak': None, 'tid': tid})
+
+    def update_parent_peak(self, peak=0):
+        if self.stack:
+            parent = self.stack[-1]
+            parent['peak'] = max(parent['peak'], peak, tracemalloc.get_traced_memory()[1])
+
+    def print_summary(self):
+        # table is written to stderr, so stdout keeps only messages (e.g. JSON lines)
+        if not self.enabled:
+            return
+        print("%-28s %6s %10s %10s %10s  %s" % ('STAGE', 'COUNT', 'WALL [s]', 'CPU [s]', 'PEAK [MB]', 'ITEMS'),
+              file=sys.stderr)
+        for name, records in self.group_records(lambda r: r['name']):
+            print(self.format_summary_line(name, records), file=sys.stderr)
+
+        files = self.group_records(lambda r: r['args'].get('file'))
+        if files:
+            print(file=sys.stderr)
+            print("%-28s %6s %10s %10s %10s  %s" % ('FILE', 'COUNT', 'WALL [s]', 'CPU [s]', 'PEAK [MB]', 'ITEMS'),
+                  file=sys.stderr)
+            for file_name, records in sorted(files, key=lambda f: -sum(r['wall'] for r in f[1])):
+                print(self.format_summary_line(os.path.basename(file_name), records), file=sys.stderr)
+
+    def group_records(self, get_key):
+        groups = dict()
+        for r in self.records:
+            key = get_key(r)
+            if key is not None:
+                groups.setdefault(key, []).append(r)
+        return list(groups.items())
+
+    @staticmethod
+    def format_summary_line(name, records):
+        counts = dict()
+        for r in records:
+            for k, v in r['counts'].items():
+                counts[k] = counts.get(k, 0) + v
+        peaks = [r['peak'] for r in records if r['peak'] is not None]
+        return "%-28s %6d %10.3f %10.3f %10s  %s" % (
+            name[:28], len(records), sum(r['wall'] for r in records), sum(r['cpu'] for r in records),
+            "%.1f" % (max(peaks) / 1e6) if peaks else '-', ', '.join("%s: %d" % i for i in counts.items()))
+
+    def write_trace(self, file_name):
+        # Chrome trace event format, can be opened by chrome://tracing or https://ui.perfetto.dev
+        events = []
+        for r in self.records:
+            args = dict(r['args'], **r['counts'])
+            args['cpu_s'] = round(r['cpu'], 6)
+            if r['peak'] is not None:
+                args['peak_mb'] = round(r['peak'] / 1e6, 3)
+            events.append({'name': r['name'], 'ph': 'X', 'pid': os.getpid(), 'tid': r['tid'],
+                           'ts': int(r['start'] * 1e6), 'dur': int(r['wall'] * 1e6), 'args': args})
+        with open(file_name, 'w', encoding='utf8') as f:
+            json.dump({'traceEvents': events}, f)
+
+
+profiler = Profiler()
@@ -0,0 +1,130 @@
+import argparse
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    from pyarrow.fs import LocalFileSystem
+except ImportError:
+    pa = None
+
+# Standings of seasons stored as partitioned columnar archive of uncompressed Arrow IPC files,
+# queries read only needed columns of memory mapped files.
+ARCHIVE_FILE_NAME = 'results.arrow'
+
+if pa is not None:
+    # one row per race result of person in standings, season is the partition key (directory 'season=2025')
+    SCHEMA = pa.schema([
+        ('category', pa.dictionary(pa.int16(), pa.string())),
+        ('race', pa.int8()),
+        ('name', pa.string()),
+        ('birth_year', pa.int16()),
+        ('team', pa.dictionary(pa.int16(), pa.string())),
+        ('position', pa.int16()),
+        ('status', pa.dictionary(pa.int8(), pa.string())),
+        ('half_points', pa.bool_()),
+        ('points', pa.int16()),
+        ('ignored', pa.bool_()),
+        ('sum_points', pa.int16()),
+        ('sum_position', pa.int16()),
+        ('standing', pa.int16()),
+        ('total_points', pa.int16()),
+    ])
+
+
+def write_season(directory, config, category_sum_results):
+    # returns path of written file, messages are reported by caller
+    if pa is None:
+        raise ImportError("'pyarrow' package is needed to write results archive")
+
+    columns = {name: [] for name in SCHEMA.names}
+    for cat_results in category_sum_results:
+        for standing, pr in enumerate(cat_results.personal_results, 1):
+            total_points = pr.race_results[-1].sum_points
+            for race, rr in enumerate(pr.race_results, 1):
+                if rr.position is None:
+                    continue
+                # DNF, DNS etc. are stored as status without position
+                is_status = isinstance(rr.position, str)
+                values = (cat_results.category.name, race, pr.person.name, pr.person.birth_year, pr.person.team,
+                          None if is_status else rr.position, rr.position if is_status else None, rr.half_points,
+                          rr.points, rr.ignored_in_summary, rr.sum_points, rr.sum_position, standing, total_points)
+                for name, value in zip(SCHEMA.names, values):
+                    columns[name].append(value)
+
+    table = pa.Table.from_pydict(columns, schema=SCHEMA)
+    partition = os.path.join(directory, 'season=%d' % config.year)
+    os.makedirs(partition, exist_ok=True)
+    path = os.path.join(partition, ARCHIVE_FILE_NAME)
+    with pa.OSFile(path + '.tmp', 'wb') as sink:
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            writer.write_table(table)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def open_archive(directory):
+    if pa is None:
+        raise ImportError("'pyarrow' package is needed to read results archive")
+    return ds.dataset(directory, format='arrow', partitioning='hive', filesystem=LocalFileSystem(use_mmap=True),
+                      exclude_invalid_files=True)
+
+
+def get_person_history(directory, name, birth_year=None):
+    # all race results of person in all seasons
+    condition = ds.field('name') == name
+    if birth_year is not None:
+        condition = condition & (ds.field('birth_year') == birth_year)
+    table = open_archive(directory).to_table(
+        columns=['season', 'category', 'race', 'birth_year', 'team', 'position', 'status', 'points', 'ignored',
+                 'sum_position', 'standing', 'total_points'], filter=condition)
+    return sorted(table.to_pylist(), key=lambda r: (r['season'], r['category'], r['race']))
+
+
+def get_category_summary(directory, seasons=None):
+    # people, race results and points of categories in seasons
+    condition = ds.field('season').isin(seasons) if seasons else None
+    table = open_archive(directory).to_table(columns=['season', 'category', 'name', 'birth_year', 'points',
+                                                      'total_points', 'status'], filter=condition)
+    # birth year is part of person, None is counted as distinct value
+    table = table.append_column('person', pc.binary_join_element_wise(
+        table['name'], pc.fill_null(pc.cast(table['birth_year'], pa.string()), ''), '|'))
+    table = table.append_column('category_name', pc.cast(table['category'], pa.string()))
+    summary = table.group_by(['season', 'category_name']).aggregate([
+        ('person', 'count_distinct'), ('points', 'count'), ('status', 'count'), ('points', 'sum'),
+        ('total_points', 'max')])
+    summary = summary.rename_columns({'category_name': 'category', 'person_count_distinct': 'people',
+                                      'points_count': 'results', 'status_count': 'dnf', 'points_sum': 'points',
+                                      'total_points_max': 'best_total_points'})
+    return summary.sort_by([('season', 'ascending'), ('category', 'ascending')]).to_pylist()
+
+
+def print_rows(rows):
+    if not rows:
+        print("No results found.")
+        return
+    print('\t'.join(rows[0].keys()))
+    for r in rows:
+        print('\t'.join('' if v is None else str(v) for v in r.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Queries archive of results written by processor.py --archive.')
+    parser.add_argument('archive', help='directory of archive')
+    commands = parser.add_subparsers(dest='command', required=True)
+    person = commands.add_parser('person', help='results of person in all seasons')
+    person.add_argument('name', help='normalized name, e.g. "Novák Jan"')
+    person.add_argument('--birth-year', type=int)
+    categories = commands.add_parser('categories', help='people and points of categories in seasons')
+    categories.add_argument('--season', type=int, action='append', help='season to summarize, can be repeated')
+    args = parser.parse_args()
+
+    if args.command == 'person':
+        print_rows(get_person_history(args.archive, args.name, args.birth_year))
+    else:
+        print_rows(get_category_summary(args.archive, args.season))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,18 @@
 import os
 import shutil
+import socket
 import subprocess
-import sys
+import time
 
 from openpyxl import load_workbook
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.worksheet import Worksheet
 from copy import copy
 
+from Diagnostics import diagnostics
+from Profiler import profiler
+
 SOFFICE_FALLBACK_PATHS = [
     '/Applications/LibreOffice.app/Contents/MacOS/soffice',
     r'C:\Program Files\LibreOffice\program\soffice.exe',
@@ -15,25 +20,52 @@ SOFFICE_FALLBACK_PATHS = [
     '/usr/local/bin/soffice',
 ]
 
+# address of long-lived LibreOffice listener 'unoserver', can be changed by UNOSERVER_ADDRESS env var.
+# If unoserver is installed (pip install unoserver) and not running, it is started in background on first PDF export
+# and kept running, so next runs don't launch LibreOffice again. Starting can be disabled by UNOSERVER_AUTOSTART=0,
+# running server can be stopped by 'pkill -f unoserver'.
+UNOSERVER_DEFAULT_ADDRESS = '127.0.0.1:2003'
+# seconds to wait for started unoserver to listen
+UNOSERVER_START_TIMEOUT = 60
+
 
 class ResultWriter:
     RACE_COUNT = 6
     FIRST_OUTPUT_WRITE_ROW = 8
     RESULT_COLUMN_COUNT = 3 + 2 + 4 * (RACE_COUNT - 1)
 
-    def __init__(self, config, category_sum_results):
+    def __init__(self, config, category_sum_results, pdf_backend='soffice', web_dir=None):
         self.config = config
         self.category_sum_results = category_sum_results
+        # 'soffice' converts written xlsx by LibreOffice, 'native' renders PDF directly by reportlab, 'none' skips PDF
+        self.pdf_backend = pdf_backend
+        # directory of static JSON results for web, not written if None
+        self.web_dir = web_dir
         self.outputFileName = "vysledky%s.xlsx" % self.config.year
         self.wb = None
         self.template_sheet = None
+        # font id of points cell -> font id of the same cell with ignored result
+        self.ignored_font_ids = dict()
 
     def write(self):
+        with profiler.stage('write_xlsx', output=self.outputFileName) as counts:
+            self.write_xlsx()
+            counts['people'] = sum(len(c.personal_results) for c in self.category_sum_results)
+        with profiler.stage('export_pdf', backend=self.pdf_backend):
+            self.export_pdf()
+        if self.web_dir:
+            with profiler.stage('write_web', output=self.web_dir):
+                from WebWriter import WebWriter
+                message = WebWriter(self.config, self.category_sum_results).write(self.web_dir)
+            diagnostics.add('info', message, 'output')
+
+    def write_xlsx(self):
         if os.path.exists(self.outputFileName):
             os.remove(self.outputFileName)
 
         self.wb = load_workbook('outputTemplate.xlsx')
         self.template_sheet = self.wb.get_sheet_by_name('Template')
+        self.ignored_font_ids.clear()
 
         for cat_results in self.category_sum_results:
             self.prepare_sheet(cat_results.category.name, self.config.year, cat_results.category.get_title(), len(cat_results.personal_results))
@@ -62,50 +94,160 @@ class ResultWriter:
         self.wb.save(self.outputFileName)
         self.wb.close()
 
-        self.export_pdf()
-
     def export_pdf(self):
-        soffice = self._find_soffice()
-        if not soffice:
-            print("WARNING: 'soffice' (LibreOffice) not found — skipping PDF export. "
-                  "Set SOFFICE_BIN env var or install LibreOffice.", file=sys.stderr)
+        if self.pdf_backend == 'none':
             return
-
         xlsx_path = os.path.abspath(self.outputFileName)
-        out_dir = os.path.dirname(xlsx_path) or '.'
-        intermediate_pdf = os.path.join(out_dir, "vysledky%s.pdf" % self.config.year)
-        target_pdf = os.path.join(out_dir, "VKCT %s.pdf" % self.config.year)
+        target_pdf = os.path.join(os.path.dirname(xlsx_path) or '.', "VKCT %s.pdf" % self.config.year)
+        if self.pdf_backend == 'native':
+            # reportlab is imported only for native export
+            from PdfWriter import PdfWriter
+            PdfWriter(self.config, self.category_sum_results).write(target_pdf)
+            return
+        self.export_pdfs([(xlsx_path, target_pdf)])
 
-        if os.path.exists(intermediate_pdf):
-            os.remove(intermediate_pdf)
+    @staticmethod
+    def export_pdfs(conversions):
+        # converts list of (xlsx path, target pdf path) pairs by unoserver if available,
+        # remaining files are converted by one soffice launch per directory
+        unoserver = ResultWriter._get_unoserver()
+        pending = [(xlsx_path, target_pdf) for xlsx_path, target_pdf in conversions
+                   if not unoserver or not ResultWriter._convert_by_unoserver(unoserver, xlsx_path, target_pdf)]
+        if pending:
+            ResultWriter._convert_by_soffice(pending)
 
-        user_install = "file://%s" % os.path.join(
-            os.path.expanduser("~"), ".cache", "lo_pdfexport_vkct"
-        )
+    @staticmethod
+    def _convert_by_unoserver(unoserver, xlsx_path, target_pdf):
+        unoconvert, host, port = unoserver
+        # previous PDF is kept until the new one is converted
+        tmp_pdf = "%s.tmp%d.pdf" % (os.path.splitext(target_pdf)[0], os.getpid())
+        if os.path.exists(tmp_pdf):
+            os.remove(tmp_pdf)
         cmd = [
-            soffice,
-            "--headless",
-            "-env:UserInstallation=%s" % user_install,
-            "--convert-to", "pdf:calc_pdf_Export",
-            "--outdir", out_dir,
+            unoconvert,
+            "--host", host,
+            "--port", port,
+            "--convert-to", "pdf",
+            "--filter", "calc_pdf_Export",
             xlsx_path,
+            tmp_pdf,
         ]
 
         try:
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
         except (subprocess.TimeoutExpired, OSError) as e:
-            print("WARNING: PDF export failed: %s" % e, file=sys.stderr)
-            return
+            diagnostics.add('warning', "PDF export by unoserver failed: %s" % e, 'pdf-export')
+            result = None
+
+        if result is None or result.returncode != 0 or not os.path.exists(tmp_pdf):
+            if result is not None:
+                diagnostics.add('warning', "PDF export by unoserver failed (exit=%d):\n%s\n%s"
+                                % (result.returncode, result.stdout, result.stderr), 'pdf-export')
+            if os.path.exists(tmp_pdf):
+                os.remove(tmp_pdf)
+            return False
+
+        os.replace(tmp_pdf, target_pdf)
+        diagnostics.add('info', "PDF exported: %s" % target_pdf, 'output')
+        return True
 
-        if result.returncode != 0 or not os.path.exists(intermediate_pdf):
-            print("WARNING: PDF export failed (exit=%d):\n%s\n%s"
-                  % (result.returncode, result.stdout, result.stderr), file=sys.stderr)
+    @staticmethod
+    def _convert_by_soffice(conversions):
+        soffice = ResultWriter._find_soffice()
+        if not soffice:
+            diagnostics.add('warning', "'soffice' (LibreOffice) not found — skipping PDF export. "
+                                       "Set SOFFICE_BIN env var or install LibreOffice.", 'pdf-export')
             return
 
-        if os.path.exists(target_pdf):
-            os.remove(target_pdf)
-        os.rename(intermediate_pdf, target_pdf)
-        print("PDF exported: %s" % target_pdf)
+        dir_conversions = dict()
+        for xlsx_path, target_pdf in conversions:
+            dir_conversions.setdefault(os.path.dirname(xlsx_path) or '.', []).append((xlsx_path, target_pdf))
+
+        user_install = "file://%s" % os.path.join(
+            os.path.expanduser("~"), ".cache", "lo_pdfexport_vkct"
+        )
+        for out_dir, conversions in dir_conversions.items():
+            intermediate_pdfs = [os.path.join(out_dir, os.path.splitext(os.path.basename(xlsx_path))[0] + ".pdf")
+                                 for xlsx_path, target_pdf in conversions]
+            for intermediate_pdf in intermediate_pdfs:
+                if os.path.exists(intermediate_pdf):
+                    os.remove(intermediate_pdf)
+
+            cmd = [
+                soffice,
+                "--headless",
+                "-env:UserInstallation=%s" % user_install,
+                "--convert-to", "pdf:calc_pdf_Export",
+                "--outdir", out_dir,
+            ] + [xlsx_path for xlsx_path, target_pdf in conversions]
+
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=300 * len(conversions))
+            except (subprocess.TimeoutExpired, OSError) as e:
+                diagnostics.add('warning', "PDF export failed: %s" % e, 'pdf-export')
+                continue
+
+            for (xlsx_path, target_pdf), intermediate_pdf in zip(conversions, intermediate_pdfs):
+                if result.returncode != 0 or not os.path.exists(intermediate_pdf):
+                    diagnostics.add('warning', "PDF export of %s failed (exit=%d):\n%s\n%s"
+                                    % (xlsx_path, result.returncode, result.stdout, result.stderr), 'pdf-export')
+                    continue
+
+                if os.path.exists(target_pdf):
+                    os.remove(target_pdf)
+                os.rename(intermediate_pdf, target_pdf)
+                diagnostics.add('info', "PDF exported: %s" % target_pdf, 'output')
+
+    @staticmethod
+    def _get_unoserver():
+        # unoconvert client and address of listening unoserver, the server is started if it is not running
+        unoconvert = shutil.which("unoconvert")
+        if not unoconvert:
+            return None
+        host, _, port = os.environ.get("UNOSERVER_ADDRESS", UNOSERVER_DEFAULT_ADDRESS).rpartition(':')
+        if not ResultWriter._is_listening(host, port) and not ResultWriter._start_unoserver(host, port):
+            return None
+        return unoconvert, host, port
+
+    @staticmethod
+    def _start_unoserver(host, port):
+        unoserver = shutil.which("unoserver")
+        if not unoserver or os.environ.get("UNOSERVER_AUTOSTART") == "0":
+            return False
+
+        cmd = [unoserver, "--interface", host, "--port", port]
+        soffice = ResultWriter._find_soffice()
+        if soffice:
+            cmd += ["--executable", soffice]
+        # detached from this process, so the server keeps running for next runs
+        if os.name == 'nt':
+            detach = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            detach = {'start_new_session': True}
+        try:
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL, **detach)
+        except OSError as e:
+            diagnostics.add('warning', "Failed to start unoserver: %s" % e, 'pdf-export')
+            return False
+
+        deadline = time.monotonic() + UNOSERVER_START_TIMEOUT
+        while process.poll() is None and time.monotonic() < deadline:
+            if ResultWriter._is_listening(host, port):
+                diagnostics.add('info', "unoserver started at %s:%s, it keeps running for next exports"
+                                % (host, port), 'pdf-export')
+                return True
+            time.sleep(0.5)
+        diagnostics.add('warning', "unoserver at %s:%s did not start" % (host, port), 'pdf-export')
+        return False
+
+    @staticmethod
+    def _is_listening(host, port):
+        try:
+            socket.create_connection((host, int(port)), timeout=1).close()
+        except (OSError, ValueError):
+            return False
+        return True
 
     @staticmethod
     def _find_soffice():
@@ -120,17 +262,41 @@ class ResultWriter:
                 return path
         return None
 
-    @staticmethod
-    def write_position_and_points(pos_cell, points_cell, race_result):
+    def write_position_and_points(self, pos_cell, points_cell, race_result):
         if race_result.position is not None:
             pos_cell.value = race_result.position if not race_result.half_points else "%s*" % race_result.position
             points_cell.value = race_result.points
             # highlight ignored results
             if race_result.ignored_in_summary:
-                font = copy(points_cell.font)
-                font.italic = True
-                font.color = 'FF808080'
-                points_cell.font = font
+                self.set_ignored_font(points_cell)
+
+    def set_ignored_font(self, cell):
+        # font is created and registered in workbook only once for each font of points cells
+        font_id = self.get_style_array(cell).fontId
+        ignored_font_id = self.ignored_font_ids.get(font_id)
+        if ignored_font_id is None:
+            font = copy(cell.font)
+            font.italic = True
+            font.color = 'FF808080'
+            cell.font = font
+            self.ignored_font_ids[font_id] = cell._style.fontId
+        else:
+            cell._style.fontId = ignored_font_id
+
+    @staticmethod
+    def get_style_array(cell):
+        if cell._style is None:
+            cell._style = StyleArray()
+        return cell._style
+
+    def copy_cell_style(self, src, dst):
+        # style objects are already registered in workbook, so only their ids are copied
+        src_style = self.get_style_array(src)
+        dst_style = self.get_style_array(dst)
+        dst_style.borderId = src_style.borderId
+        dst_style.fillId = src_style.fillId
+        dst_style.fontId = src_style.fontId
+        dst_style.alignmentId = src_style.alignmentId
 
     def prepare_sheet(self, cat_name, year, cat_title, line_count):
         last_output_column = self.RESULT_COLUMN_COUNT + 1
@@ -142,11 +308,7 @@ class ResultWriter:
         for col in range(2, last_output_column + 1):
             src = ws.cell(row=self.FIRST_OUTPUT_WRITE_ROW, column=col)
             for row in range(self.FIRST_OUTPUT_WRITE_ROW + 1, self.FIRST_OUTPUT_WRITE_ROW + line_count):
-                n = ws.cell(row=row, column=col)
-                n.border = src.border.copy()
-                n.fill = src.fill.copy()
-                n.font = src.font.copy()
-                n.alignment = src.alignment.copy()
+                self.copy_cell_style(src, ws.cell(row=row, column=col))
 
         ws.freeze_panes = ws.cell(row=self.FIRST_OUTPUT_WRITE_ROW, column=5)
         ws.print_area = f'B2:{get_column_letter(last_output_column)}{line_count - 1 + self.FIRST_OUTPUT_WRITE_ROW:d}'
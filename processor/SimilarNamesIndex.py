@@ -0,0 +1,64 @@
+from collections import Counter
+
+from NameMatching import get_name_variants
+
+
+# Index returning candidates of names, which may have SequenceMatcher ratio above min_ratio.
+#
+# Ratio of SequenceMatcher is 2*M/T, where M (count of matching chars) is at most the size of intersection of character
+# multisets of both names. So the ratio is bounded by Dice coefficient of the multisets and pairs without enough common
+# characters can't be similar. Candidates are found by prefix filtering: characters are ordered by their frequency
+# and only the rarest characters of each name, which must be shared by every pair above min_ratio, are indexed.
+# Names sharing some of them are verified by the exact bound before returning.
+class SimilarNamesIndex:
+    def __init__(self, names, min_ratio):
+        self.min_ratio = min_ratio
+        records = [[self.to_tokens(v) for v in get_name_variants(name)] for name in names]
+        self.char_counts = [[(Counter(v), len(v)) for v in get_name_variants(name)] for name in names]
+
+        frequencies = Counter()
+        for variants in records:
+            for tokens in variants:
+                frequencies.update(tokens)
+        rank = {token: (count, token) for token, count in frequencies.items()}
+
+        self.prefixes = []
+        self.index = dict()
+        for name_idx, variants in enumerate(records):
+            prefix = set()
+            for tokens in variants:
+                tokens.sort(key=rank.get)
+                prefix.update(tokens[:self.get_prefix_length(len(tokens))])
+            for token in prefix:
+                self.index.setdefault(token, []).append(name_idx)
+            self.prefixes.append(prefix)
+
+    def get_candidates(self, name_idx):
+        # indexes of names following name_idx, which may be similar to it, in ascending order
+        candidates = set()
+        for token in self.prefixes[name_idx]:
+            candidates.update(self.index[token])
+        return sorted(i for i in candidates if i > name_idx and self.may_be_similar(name_idx, i))
+
+    def may_be_similar(self, idx_a, idx_b):
+        for chars_a, size_a in self.char_counts[idx_a]:
+            for chars_b, size_b in self.char_counts[idx_b]:
+                common = sum((chars_a & chars_b).values())
+                if 2.0 * common / (size_a + size_b) > self.min_ratio:
+                    return True
+        return False
+
+    def get_prefix_length(self, size):
+        # every similar multiset shares at least min_overlap items with this one
+        min_overlap = int(self.min_ratio * size / (2 - self.min_ratio))
+        return min(size, size - min_overlap + 1)
+
+    @staticmethod
+    def to_tokens(s):
+        # multiset of characters as set of (char, occurrence) pairs
+        seen = Counter()
+        tokens = []
+        for c in s:
+            seen[c] += 1
+            tokens.append((c, seen[c]))
+        return tokens
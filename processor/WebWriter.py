@@ -0,0 +1,139 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import unicodedata
+
+# words of folded names, the same words are searched by web page
+SEARCH_WORD_RE = re.compile(r'[a-z0-9]+')
+
+# Static JSON API of season results for web pages (see web/vkct-vysledky.html), written to <directory>/<year>:
+#   index.json                 categories of season
+#   categories/<category>.json standings of category
+#   people/<person>.json       results of person in all categories of season
+#   search/<prefix>.json       people with a word of name starting with prefix (without diacritics)
+# every file is written also gzip compressed (.json.gz) to be served by web server as is
+class WebWriter:
+    SEARCH_PREFIX_LENGTH = 2
+
+    def __init__(self, config, category_sum_results):
+        self.config = config
+        self.category_sum_results = category_sum_results
+
+    def write(self, directory):
+        # returns message about written files for diagnostics of caller
+        season_dir = os.path.join(directory, str(self.config.year))
+        # season is written to temporary directory and then replaces the previous one, so no stale files are left
+        tmp_dir = "%s.tmp%d" % (season_dir, os.getpid())
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        category_ids = get_unique_ids([c.category.name for c in self.category_sum_results])
+        categories = []
+        people = dict()
+        for cat_id, cat_results in zip(category_ids, self.category_sum_results):
+            category = cat_results.category
+            rows = []
+            for standing, pr in enumerate(cat_results.personal_results, 1):
+                key = (pr.person.name, pr.person.birth_year)
+                if key not in people:
+                    people[key] = {'name': pr.person.name, 'birth_year': pr.person.birth_year, 'results': []}
+                races = [self.get_race_result(rr) for rr in pr.race_results]
+                rows.append((key, {'standing': standing, 'name': pr.person.name, 'team': pr.person.team,
+                                   'birth_year': pr.person.birth_year,
+                                   'total_points': pr.race_results[-1].sum_points,
+                                   'races': races}))
+                people[key]['results'].append({'category': cat_id, 'category_name': category.name,
+                                               'team': pr.person.team, 'standing': standing,
+                                               'people': len(cat_results.personal_results),
+                                               'total_points': rows[-1][1]['total_points'], 'races': races})
+            categories.append((cat_id, category, rows))
+
+        person_ids = dict(zip(people.keys(), get_unique_ids(
+            ["%s %s" % (name, birth_year if birth_year is not None else '') for name, birth_year in people])))
+
+        index = {'year': self.config.year, 'categories': []}
+        for cat_id, category, rows in categories:
+            index['categories'].append({'id': cat_id, 'name': category.name, 'title': category.get_title(),
+                                        'people': len(rows), 'races': category.get_race_count()})
+            write_json(os.path.join(tmp_dir, 'categories', cat_id + '.json'), {
+                'year': self.config.year, 'id': cat_id, 'name': category.name, 'title': category.get_title(),
+                'races': category.get_race_count(),
+                'results': [dict(row, person=person_ids[key]) for key, row in rows]})
+        write_json(os.path.join(tmp_dir, 'index.json'), index)
+
+        prefixes = dict()
+        for key, person in people.items():
+            person_id = person_ids[key]
+            write_json(os.path.join(tmp_dir, 'people', person_id + '.json'),
+                       dict({'year': self.config.year, 'id': person_id}, **person))
+            entry = {'person': person_id, 'name': person['name'], 'birth_year': person['birth_year'],
+                     'team': person['results'][0]['team'],
+                     'categories': [r['category_name'] for r in person['results']]}
+            for prefix in {w[:self.SEARCH_PREFIX_LENGTH] for w in SEARCH_WORD_RE.findall(fold_text(person['name']))
+                           if len(w) >= self.SEARCH_PREFIX_LENGTH}:
+                prefixes.setdefault(prefix, []).append(entry)
+        for prefix, entries in prefixes.items():
+            write_json(os.path.join(tmp_dir, 'search', prefix + '.json'),
+                       sorted(entries, key=lambda e: fold_text(e['name'])))
+
+        shutil.rmtree(season_dir, ignore_errors=True)
+        os.replace(tmp_dir, season_dir)
+        self.write_seasons(directory)
+        return "Web results written: %s (%d categories, %d people)" % (season_dir, len(categories), len(people))
+
+    @staticmethod
+    def get_race_result(rr):
+        # only set values are written to keep files small
+        result = dict()
+        if rr.position is not None:
+            result['position'] = rr.position
+            result['points'] = rr.points
+            if rr.half_points:
+                result['half_points'] = True
+            if rr.ignored_in_summary:
+                result['ignored'] = True
+        if rr.sum_points is not None:
+            result['sum_points'] = rr.sum_points
+            result['sum_position'] = rr.sum_position
+        return result
+
+    @staticmethod
+    def write_seasons(directory):
+        # list of written seasons, newest first
+        years = sorted((int(d) for d in os.listdir(directory)
+                        if d.isdecimal() and os.path.exists(os.path.join(directory, d, 'index.json'))), reverse=True)
+        # seasons can be written by more worker processes at once
+        write_json(os.path.join(directory, 'seasons.json'), years, atomic=True)
+
+
+def write_json(path, value, atomic=False):
+    data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for file_path, content in ((path, data), (path + '.gz', gzip.compress(data, 9, mtime=0))):
+        tmp_path = "%s.tmp%d" % (file_path, os.getpid()) if atomic else file_path
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        if atomic:
+            os.replace(tmp_path, file_path)
+
+
+def fold_text(text):
+    # lower case without diacritics, the same folding is done by search of web page
+    return ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c)).lower()
+
+
+def get_unique_ids(names):
+    # ids usable in file names and URLs, e.g. 'Novák Jan 2015' -> 'novak-jan-2015'
+    ids = []
+    used = set()
+    for name in names:
+        base = re.sub(r'[^a-z0-9]+', '-', fold_text(name)).strip('-') or 'x'
+        unique = base
+        i = 2
+        while unique in used:
+            unique = "%s-%d" % (base, i)
+            i = i + 1
+        used.add(unique)
+        ids.append(unique)
+    return ids
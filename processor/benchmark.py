@@ -0,0 +1,193 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+from openpyxl import Workbook
+
+import NameMatching
+import processor
+from Diagnostics import diagnostics
+from ResultWriter import ResultWriter
+
+BENCHMARK_YEAR = 2099
+SURNAME_SYLLABLES = ['no', 'vá', 'kov', 'svo', 'bo', 'da', 'dvo', 'řák', 'čer', 'ný', 'pro', 'ko', 'pec', 'hor',
+                     'ká', 'maš', 'lík', 've', 'se', 'lý', 'ze', 'man', 'ru', 'žič', 'ka', 'ber', 'ger', 'tr']
+TEAMS = [None, 'TJ Sokol', 'Cyklo Klub', 'SK Bike', 'KC Kolo', 'MTB Team', 'Cykloservis', 'Sport Club']
+
+
+# Synthetic season: race workbooks with one sheet per category and config workbook in format of config*.xlsx
+def generate_season(directory, category_count, race_count, runner_count, duplicate_rate, seed):
+    rnd = random.Random(seed)
+    # runners of each race are sampled from a bigger pool of people of category
+    pool_size = int(runner_count * 1.3)
+    first_names = sorted(n for n in processor.get_first_names() if n and '_' not in n)
+    surnames = set()
+    while len(surnames) < category_count * pool_size:
+        surname = ''.join(rnd.choice(SURNAME_SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()
+        if surname not in processor.get_first_names():
+            surnames.add(surname)
+    surnames = sorted(surnames)
+
+    categories = []
+    for c in range(category_count):
+        min_age = 2 * c
+        name = 'Kategorie %02d' % (c + 1)
+        people = [[rnd.choice(first_names), surnames.pop(rnd.randrange(len(surnames))), rnd.choice(TEAMS),
+                   BENCHMARK_YEAR - min_age - rnd.randint(0, 1)] for _ in range(pool_size)]
+        categories.append((name, min_age, min_age + 1, people))
+
+    race_files = []
+    for r in range(race_count):
+        wb = Workbook()
+        wb.remove(wb.active)
+        for name, min_age, max_age, people in categories:
+            ws = wb.create_sheet(name)
+            ws.append([name])
+            ws.append([])
+            ws.append(['Pořadí', 'Jméno', 'Klub', 'Ročník'])
+            runners = rnd.sample(people, runner_count)
+            for pos, (first_name, surname, team, birth_year) in enumerate(runners, 1):
+                if rnd.random() < duplicate_rate:
+                    # typo in surname, the same person is then reported as similar name
+                    i = rnd.randrange(1, len(surname))
+                    surname = surname[:i] + rnd.choice('aeiouy') + surname[i + 1:]
+                name_text = "%s %s" % (surname, first_name) if rnd.random() < 0.5 else "%s %s" % (first_name, surname)
+                position = pos if rnd.random() > 0.02 else 'DNF'
+                ws.append([position, name_text, team, birth_year if rnd.random() > 0.05 else None])
+        file_name = os.path.join(directory, 'race%02d.xlsx' % (r + 1))
+        wb.save(file_name)
+        race_files.append(file_name)
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = 'Kategorie'
+    ws['A1'] = 'Rok:'
+    ws['B1'] = BENCHMARK_YEAR
+    ws['A2'] = 'Max pocet započítaných zavodů:'
+    ws['B2'] = max(1, race_count - 2)
+    for c, (name, min_age, max_age, people) in enumerate(categories):
+        ws.cell(row=5 + c, column=1).value = name
+        ws.cell(row=5 + c, column=2).value = min_age
+        ws.cell(row=5 + c, column=3).value = max_age
+        ws.cell(row=5 + c, column=6).value = 1 if c > 0 else 0
+        cs = wb.create_sheet(name)
+        cs.append(['Zdroj', 'Strana', 'první řádek', 'jmeno sl.', 'jmeno2 sl.', 'team sl.', 'rok sl.', 'pořadí sl.',
+                   'alternativní'])
+        for file_name in race_files:
+            cs.append([file_name, name, 4, 'B', None, 'C', 'D', 'A', None])
+    config_file = os.path.join(directory, 'config%d.xlsx' % BENCHMARK_YEAR)
+    wb.save(config_file)
+    return config_file
+
+
+def run_pipeline(config_file, jobs, pdf_backend):
+    # the same stages as process_results, each one timed separately
+    stages = dict()
+    counts = dict()
+
+    def stage(name, fn, *args):
+        start = time.perf_counter()
+        res = fn(*args)
+        stages[name] = time.perf_counter() - start
+        return res
+
+    processor.workbookCache.clear()
+    processor.parse_name.cache_clear()
+    NameMatching.get_names_matching_ratio.cache_clear()
+    diagnostics.clear()
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        config = stage('load_config', processor.load_config, config_file)
+        stage('read_results', processor.read_results, config, True, jobs)
+        stage('fill_missing_birth_years', processor.fill_missing_birth_years, config)
+        results = stage('extract_summary_results', processor.extract_summary_results, config)
+        stage('complete_summary_results', processor.complete_summary_results, results, config.max_race_count)
+        stage('check_names', processor.check_names, results)
+        stage('write', ResultWriter(config, results, pdf_backend).write)
+
+    counts['categories'] = len(config.categories)
+    counts['inputs'] = sum(len(c.inputs) for c in config.categories)
+    counts['result_lines'] = sum(len(r) for c in config.categories for r in c.results)
+    counts['people'] = sum(len(c.personal_results) for c in results)
+    counts['similar_names'] = diagnostics.count('warning', 'similar-names')
+    return stages, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times stages of processing of synthetic season.')
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--races', type=int, default=6)
+    parser.add_argument('--runners', type=int, default=60, help='runners per race and category')
+    parser.add_argument('--duplicates', type=float, default=0.02, help='rate of names with a typo')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3, help='best time of repeated runs is reported')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--pdf', choices=['soffice', 'native', 'none'], default='none')
+    parser.add_argument('--keep', help='directory to keep generated season in')
+    parser.add_argument('--output', help='JSON file with results')
+    parser.add_argument('--compare', help='JSON file with previous results to compare with')
+    args = parser.parse_args()
+
+    directory = os.path.abspath(args.keep) if args.keep else tempfile.mkdtemp(prefix='vkct-bench-')
+    os.makedirs(directory, exist_ok=True)
+    template = os.path.abspath('outputTemplate.xlsx')
+    cwd = os.getcwd()
+    try:
+        start = time.perf_counter()
+        config_file = generate_season(directory, args.categories, args.races, args.runners, args.duplicates,
+                                      args.seed)
+        print("Generated season in %.2fs: %s" % (time.perf_counter() - start, directory))
+
+        # output is written to the season directory
+        shutil.copy(template, directory)
+        os.chdir(directory)
+        best = None
+        counts = None
+        for _ in range(args.repeat):
+            stages, counts = run_pipeline(config_file, args.jobs, args.pdf)
+            best = stages if best is None else {k: min(v, stages[k]) for k, v in best.items()}
+    finally:
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    result = {
+        'params': {k: getattr(args, k) for k in ('categories', 'races', 'runners', 'duplicates', 'seed', 'repeat',
+                                                 'jobs', 'pdf')},
+        'python': platform.python_version(),
+        'stages': best,
+        'total': sum(best.values()),
+        'counts': counts,
+    }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf8') as f:
+            previous = json.load(f)
+    print_result(result, previous)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            json.dump(result, f, indent=2)
+
+
+def print_result(result, previous):
+    stages = dict(result['stages'], total=result['total'])
+    prev_stages = dict(previous['stages'], total=previous['total']) if previous else dict()
+    for name, seconds in stages.items():
+        line = "%-26s %9.3fs" % (name, seconds)
+        if name in prev_stages:
+            line += "  %9.3fs  %+6.1f%%" % (prev_stages[name], 100.0 * (seconds / prev_stages[name] - 1))
+        print(line)
+    print(', '.join("%s: %d" % (k, v) for k, v in result['counts'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,30 +1,45 @@
 # coding: utf-8
-import difflib
+import csv
+import hashlib
+import heapq
+import os
+import pickle
 import re
-from collections import namedtuple
+import sys
+import time
+from collections import Counter, namedtuple
+from functools import lru_cache
+from itertools import repeat
 
-from openpyxl import load_workbook
+from Diagnostics import SourcePosition, diagnostics
+from Profiler import profiler
 
-from ResultWriter import ResultWriter
+# openpyxl, writers, name matching and first names are loaded only when needed, so the module is cheap to import
 
 
 class Person:
+    __slots__ = ('name', 'team', 'birth_year')
+
     def __init__(self, name, team, birth_year):
         self.name = name
         self.team = team
         self.birth_year = birth_year
 
     def get_key(self):
-        return ("%s@%s" % (self.name, self.birth_year)).encode('utf-8')
+        return personRegistry.get_id(self.name, self.birth_year)
 
 
 class PersonForCheck:
+    __slots__ = ('person', 'sourceYears')
+
     def __init__(self, person: Person):
         self.person = person
         self.sourceYears = list[str]()
 
 
 class ResultLine:
+    __slots__ = ('person', 'position', 'approved_pos', 'is_alternative')
+
     def __init__(self, person, position, approved_pos, is_alternative):
         self.person = person
         self.position = position
@@ -33,6 +48,8 @@ class ResultLine:
 
 
 class RaceResult:
+    __slots__ = ('position', 'points', 'sum_points', 'sum_position', 'half_points', 'ignored_in_summary')
+
     def __init__(self):
         self.position = None
         self.points = None
@@ -43,11 +60,11 @@ class RaceResult:
 
 
 class PersonalResults:
+    __slots__ = ('person', 'race_results')
+
     def __init__(self, person, race_count):
         self.person = person
-        self.race_results = list[RaceResult]()
-        for i in range(race_count):
-            self.race_results.append(RaceResult())
+        self.race_results = [RaceResult() for _ in range(race_count)]
 
 
 class CategorySummaryResults:
@@ -87,29 +104,531 @@ CategoryInput = namedtuple("CategoryInput",
 Config = namedtuple("Config", "year, max_race_count, categories")
 
 
-class ParsePosition:
+# input workbooks loaded in read-only mode, each file is parsed once even if it is used by more categories
+class WorkbookCache:
     def __init__(self):
-        self.file = None
-        self.sheet = None
-        self.row = None
+        self.workbooks = dict()
+
+    def get_sheet(self, file_name, sheet_name):
+        return self.get_workbook(file_name)[sheet_name]
+
+    def get_workbook(self, file_name):
+        path = os.path.abspath(file_name)
+        mtime = os.path.getmtime(path)
+        cached = self.workbooks.get(path)
+        if cached is not None:
+            if cached[0] == mtime:
+                return cached[1]
+            # file was changed since loaded
+            cached[1].close()
+
+        wb = load_input_workbook(path)
+        self.workbooks[path] = (mtime, wb)
+        return wb
+
+    def clear(self):
+        for mtime, wb in self.workbooks.values():
+            wb.close()
+        self.workbooks.clear()
+
+
+workbookCache = WorkbookCache()
+
+
+def load_input_workbook(file_name):
+    if is_text_input(file_name):
+        return TextWorkbook(file_name)
+    from openpyxl import load_workbook
+    wb = load_workbook(file_name, read_only=True)
+    for ws in wb.worksheets:
+        # dimensions stored by some exporters are wrong, read rows until the end of data
+        ws.reset_dimensions()
+    return wb
+
+
+def is_text_input(file_name):
+    return os.path.splitext(file_name)[1].lower() in TEXT_INPUT_DELIMITERS
+
+
+TextCell = namedtuple("TextCell", "value, font")
+TextFont = namedtuple("TextFont", "b, i, u")
+# approval mark of xlsx cell (bold, italic and underlined font)
+APPROVED_TEXT_FONT = TextFont(True, True, 'single')
+
+
+# CSV/TSV results read in the same way as read-only workbook, the file is one sheet of any name.
+# Cells with approval marks are listed in sidecar file '<file>.approved' (e.g. 'D12 E15').
+class TextWorkbook:
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def __getitem__(self, sheet_name):
+        return self
+
+    def close(self):
+        pass
+
+    def iter_rows(self, min_row=1, min_col=1, max_col=None, values_only=False):
+        approved = set() if values_only else load_approved_cells(self.file_name)
+        with open(self.file_name, encoding='utf-8-sig', newline='') as f:
+            delimiter = TEXT_INPUT_DELIMITERS[os.path.splitext(self.file_name)[1].lower()]
+            if delimiter is None:
+                # spreadsheets with Czech locale export CSV separated by semicolons
+                sample = f.read(4096)
+                f.seek(0)
+                delimiter = ';' if sample.count(';') > sample.count(',') else ','
+            for row, record in enumerate(csv.reader(f, delimiter=delimiter), 1):
+                if row < min_row:
+                    continue
+                last_col = max_col if max_col is not None else max(len(record), min_col)
+                values = [parse_text_value(v) for v in record[min_col - 1:last_col]]
+                values += [None] * (last_col - min_col + 1 - len(values))
+                if values_only:
+                    yield tuple(values)
+                else:
+                    yield tuple(TextCell(v, APPROVED_TEXT_FONT if (row, col) in approved else None)
+                                for col, v in enumerate(values, min_col))
+
+
+def parse_text_value(text):
+    # the same types as openpyxl returns for cells
+    if not text:
+        return None
+    if INT_VALUE_RE.match(text):
+        return int(text)
+    if FLOAT_VALUE_RE.match(text):
+        return float(text)
+    return text
+
 
+def get_approved_cells_file(file_name):
+    return file_name + '.approved'
 
-parsePosition = ParsePosition()
 
+def load_approved_cells(file_name):
+    # (row, column) of cells listed in sidecar file, '#' starts comment
+    try:
+        with open(get_approved_cells_file(file_name), encoding='utf-8') as f:
+            text = f.read()
+    except FileNotFoundError:
+        return set()
+    cells = set()
+    for line in text.splitlines():
+        for col_name, row in CELL_REFERENCE_RE.findall(line.partition('#')[0].upper()):
+            col = 0
+            for c in col_name:
+                col = col * 26 + ord(c) - ord('A') + 1
+            cells.add((int(row), col))
+    return cells
+
+
+# parsed rows of input sheets stored on disk, keyed by hash of file content and sheet mapping
+class SheetRowsCache:
+    VERSION = 1
 
-def main():
-    process_results('config2026.xlsx')
-    # build_people_list('configValidator.xlsx')
-    pass
+    def __init__(self):
+        self.directory = None
+
+    def get(self, file_name, sheet_key):
+        if not self.directory:
+            return None
+        path = self.get_entry_path(file_name, sheet_key)
+        try:
+            with open(path, 'rb') as f:
+                return [SheetRow(*r) for r in pickle.load(f)]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            warning("Ignoring broken cache entry %s: %s" % (path, e), 'broken-cache')
+            return None
+
+    def put(self, file_name, sheet_key, rows):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_entry_path(file_name, sheet_key)
+        # store plain tuples, so entries don't depend on module of SheetRow
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump([tuple(r) for r in rows], f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def get_entry_path(self, file_name, sheet_key):
+        key = "%d|%s|%r" % (self.VERSION, get_input_hash(file_name), sheet_key)
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+
+sheetRowsCache = SheetRowsCache()
+
+
+# standings of categories stored by previous run, category is computed again only if its input sheets changed
+# or if birth years it filled from other categories or seasons changed
+class StandingsStore:
+    VERSION = 4
+
+    def __init__(self, directory, config_file, config, use_registry=False):
+        config_name = os.path.splitext(os.path.basename(config_file))[0]
+        self.path = os.path.join(directory, 'standings-%s.pickle' % config_name)
+        self.config = config
+        self.use_registry = use_registry
+        self.entries = dict()
+        # keys of categories are computed before inputs are read, so they match the stored standings
+        self.keys = dict()
+        try:
+            with open(self.path, 'rb') as f:
+                self.entries = pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            warning("Ignoring broken standings store %s: %s" % (self.path, e), 'broken-cache')
+
+    def get(self, category):
+        # returns standings, birth years of names in category and birth years looked up outside of category
+        key = self.keys[category.name] = self.get_category_key(category)
+        entry = self.entries.get(category.name)
+        if entry is None or entry[0] != key:
+            return None
+
+        cat_res = CategorySummaryResults(category)
+        for name, team, birth_year, race_results in entry[1]:
+            pr = PersonalResults(Person(name, team, birth_year), 0)
+            for values in race_results:
+                rr = RaceResult()
+                rr.position, rr.points, rr.sum_points, rr.sum_position, rr.half_points, rr.ignored_in_summary = values
+                pr.race_results.append(rr)
+            cat_res.personal_results.append(pr)
+        return cat_res, entry[2], entry[3]
+
+    def put(self, cat_res, birth_years, lookups):
+        # plain tuples only, so the store doesn't depend on module of classes
+        people = []
+        for pr in cat_res.personal_results:
+            race_results = [(rr.position, rr.points, rr.sum_points, rr.sum_position, rr.half_points,
+                             rr.ignored_in_summary) for rr in pr.race_results]
+            people.append((pr.person.name, pr.person.team, pr.person.birth_year, race_results))
+        name = cat_res.category.name
+        self.entries[name] = (self.keys[name], people, birth_years, lookups)
+
+    def save(self):
+        # categories removed from config are dropped
+        names = {c.name for c in self.config.categories}
+        self.entries = {name: entry for name, entry in self.entries.items() if name in names}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'wb') as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+
+    def get_category_key(self, category):
+        # everything the standings of category depend on, names are normalized by list of first names,
+        # input sheets are compared by fingerprints, so edits of sheets of other categories don't matter
+        c = category
+        key = [self.VERSION, self.config.max_race_count, c.count_positions, get_file_hash(FIRST_NAMES_FILE),
+               self.use_registry, c.name, c.min_year, c.max_year]
+        key += [(tuple(i), get_sheet_fingerprint(i.file_name, i.sheet_name)) for i in c.inputs]
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+
+# stable integer ids of people (normalized name and birth year), ids are stored in cache directory,
+# so the same person has the same id in all runs and seasons.
+# Birth years of names are stored for each season and replaced whenever the season is processed again,
+# so corrected birth years don't stay in the registry. Birth years are looked up in seasons as loaded,
+# so all seasons of a run see the same registry, whether they are processed in sequence or by worker processes.
+class PersonRegistry:
+    VERSION = 2
 
+    def __init__(self):
+        self.path = None
+        self.ids = dict()
+        self.people = []
+        self.stored_count = 0
+        # season -> {name: birth years} of inputs of the season
+        self.seasons = dict()
+        # name -> {season: birth years} of loaded seasons
+        self.birth_years = dict()
+        self.seasons_changed = False
+
+    def load(self, directory):
+        # state of previous season of reused worker process is dropped
+        self.__init__()
+        if directory is None:
+            return
+        self.path = os.path.join(directory, 'people.pickle')
+        try:
+            with open(self.path, 'rb') as f:
+                stored = pickle.load(f)
+            # ids of previous version are kept, its birth years are not stored by season, so they are dropped
+            if stored[0] in (1, self.VERSION):
+                self.people = list(stored[1])
+                self.ids = {key: person_id for person_id, key in enumerate(self.people)}
+            if stored[0] == self.VERSION:
+                self.seasons = dict(stored[2])
+                for season, birth_years in self.seasons.items():
+                    for name, years in birth_years.items():
+                        self.birth_years.setdefault(name, dict())[season] = years
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            warning("Ignoring broken person registry %s: %s" % (self.path, e), 'broken-cache')
+        self.stored_count = len(self.people)
+        self.seasons_changed = False
+
+    def save(self):
+        # ids are only added, so the registry is written only if new people were found or seasons processed
+        if not self.path or (self.stored_count == len(self.people) and not self.seasons_changed):
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path + '.tmp', 'wb') as f:
+            pickle.dump((self.VERSION, self.people, self.seasons), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.path + '.tmp', self.path)
+        self.stored_count = len(self.people)
+        self.seasons_changed = False
+
+    def get_id(self, name, birth_year):
+        key = (name, birth_year)
+        person_id = self.ids.get(key)
+        if person_id is None:
+            person_id = self.ids[key] = len(self.people)
+            self.people.append(key)
+        return person_id
+
+    def set_season_birth_years(self, season, birth_years):
+        # birth years of names in inputs of season (before missing ones are filled) replace the stored ones,
+        # they are looked up after next load
+        self.seasons[season] = birth_years
+        self.seasons_changed = True
+
+    def get_birth_years(self, name, season):
+        # known birth years of name from other seasons
+        years = set()
+        for s, season_years in self.birth_years.get(name, {}).items():
+            if s != season:
+                years.update(season_years)
+        return years
+
+    def get_person(self, person_id):
+        # (name, birth_year) of person id
+        return self.people[person_id]
+
+
+personRegistry = PersonRegistry()
+
+
+# parsed rows of input sheets and standings of season kept in memory by watch mode,
+# only changed sheets are parsed again and only categories depending on them are computed again
+class WatchedSeason:
+    def __init__(self, config, use_registry):
+        self.config = config
+        self.use_registry = use_registry
+        # input -> (sheet fingerprint, rows)
+        self.sheet_rows = dict()
+        # birth years of names in categories before filling and birth years looked up outside of categories
+        self.birth_years = dict()
+        self.lookups = dict()
+        self.results = dict()
+
+    def update(self, categories):
+        # categories with unchanged sheets (other sheets of workbook were saved) keep their standings,
+        # categories which filled birth years of names changed in other categories are computed too,
+        # returns all computed categories
+        categories = [c for c in self.config.categories if c in categories or c.name not in self.results]
+        changed_inputs = self.read_sheets(categories)
+        categories = [c for c in categories
+                      if c.name not in self.results or any(i in changed_inputs for i in c.inputs)]
+        self.load_results(categories)
+        for cat in categories:
+            self.birth_years[cat.name] = get_category_birth_years(cat)
+        season_years = get_season_birth_years(self.birth_years.values())
+        personRegistry.set_season_birth_years(self.config.year, season_years)
+        dependent = [c for c in self.config.categories if c not in categories
+                     and not has_same_lookups(self.lookups[c.name], season_years, self.config.year)]
+        self.load_results(dependent)
+
+        changed_config = self.config._replace(categories=[c for c in self.config.categories
+                                                          if c in categories or c in dependent])
+        self.lookups.update(fill_missing_birth_years(changed_config, season_years, self.use_registry))
+        computed_results = extract_summary_results(changed_config)
+        complete_summary_results(computed_results, self.config.max_race_count)
+        check_names(computed_results)
+        for cat_res in computed_results:
+            self.results[cat_res.category.name] = cat_res
+        return changed_config.categories
+
+    def read_sheets(self, categories):
+        # workbooks are closed right after changed sheets are read, so Excel can save them while watched,
+        # rows are kept only if all changed sheets were read, returns inputs with changed sheets
+        file_inputs = dict()
+        for cat in categories:
+            for i in cat.inputs:
+                fingerprint = get_sheet_fingerprint(i.file_name, i.sheet_name)
+                cached = self.sheet_rows.get(i)
+                if cached is None or cached[0] != fingerprint:
+                    file_inputs.setdefault(i.file_name, dict())[i] = fingerprint
+        sheet_rows = dict()
+        for file_name, inputs in file_inputs.items():
+            rows_list, timing = read_file_sheet_rows(file_name, list(inputs), True)
+            for (i, fingerprint), rows in zip(inputs.items(), rows_list):
+                if rows is None:
+                    error("Failed to get sheet '%s' from %s" % (i.sheet_name, i.file_name), 'missing-sheet')
+                    raise KeyError(i.sheet_name)
+                sheet_rows[i] = (fingerprint, rows)
+        self.sheet_rows.update(sheet_rows)
+        return sheet_rows.keys()
+
+    def load_results(self, categories):
+        # standings are dropped first, so they are computed again next time if computing fails
+        for cat in categories:
+            self.results.pop(cat.name, None)
+            cat.results = [normalize_sheet_rows(self.sheet_rows[i][1], i.file_name, i.sheet_name, i.is_alternative,
+                                                cat, True) for i in cat.inputs]
+
+    def get_results(self):
+        return [self.results[c.name] for c in self.config.categories]
+
+
+fileHashes = dict()
+
+
+def get_file_hash(file_name):
+    path = os.path.abspath(file_name)
+    mtime = os.path.getmtime(path)
+    cached = fileHashes.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        file_hash = hashlib.sha1(f.read()).hexdigest()
+    fileHashes[path] = (mtime, file_hash)
+    return file_hash
+
+
+def get_input_hash(file_name):
+    # approval marks of text input are stored in sidecar file
+    file_hash = get_file_hash(file_name)
+    if is_text_input(file_name) and os.path.exists(get_approved_cells_file(file_name)):
+        file_hash += get_file_hash(get_approved_cells_file(file_name))
+    return file_hash
+
+
+COMMANDS = ['process', 'validate-people', 'export-pdf']
+
+
+def main(argv=None):
+    import argparse
+    argv = sys.argv[1:] if argv is None else argv
+    # processing of results is the default command
+    if not any(a in COMMANDS for a in argv) and '-h' not in argv and '--help' not in argv:
+        argv = ['process'] + argv
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--jobs', type=int, default=1,
+                        help='number of processes used to parse input workbooks (0 = number of CPUs)')
+    common.add_argument('--cache-dir',
+                        help='directory for cache of parsed input sheets, inputs are parsed again only if changed')
+    common.add_argument('--name-matching', choices=['difflib', 'rapidfuzz'], default='difflib',
+                        help='similarity of names used to detect duplicates, rapidfuzz is faster, but reports more pairs')
+    common.add_argument('--profile', action='store_true', default=bool(os.environ.get('VKCT_PROFILE')),
+                        help='print time, CPU time, peak memory and counts of processing stages (also VKCT_PROFILE env var)')
+    common.add_argument('--trace',
+                        help='write profile of stages in Chrome trace format to the file (implies --profile)')
+    common.add_argument('--diagnostics', choices=['text', 'json'], default='text',
+                        help='format of messages, json writes one JSON object per line')
+    common.add_argument('--fail-on', choices=['warning', 'error'],
+                        help='exit with status 1 if a message of the level (or more severe) was reported')
+
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+    process = commands.add_parser('process', parents=[common], help='compute standings and write results (default)')
+    process.add_argument('config', nargs='*', default=['config2026.xlsx'],
+                         help='config of season, more seasons are processed together (in parallel with --jobs)')
+    process.add_argument('--incremental', action='store_true',
+                         help='reuse standings of categories with unchanged inputs from previous run (needs --cache-dir)')
+    process.add_argument('--multi-season-birth-years', action='store_true',
+                         help='fill missing birth years also from other seasons processed with the same cache dir, '
+                              'including later seasons, as stored by previous runs (needs --cache-dir)')
+    process.add_argument('--watch', action='store_true',
+                         help='process results again whenever an input workbook of the config is saved')
+    process.add_argument('--pdf', choices=['soffice', 'native', 'none'], default='soffice',
+                         help='PDF export by LibreOffice (soffice/unoserver) or native rendering without LibreOffice')
+    process.add_argument('--web', metavar='DIR',
+                         help='write also static JSON results for web pages, e.g. ../web/vysledky/api')
+    process.add_argument('--archive', metavar='DIR',
+                         help='store standings also to columnar archive of seasons (needs pyarrow), '
+                              'see ResultArchive.py for queries')
+    validate = commands.add_parser('validate-people', parents=[common],
+                                   help='report similar names of people in results of previous seasons')
+    validate.add_argument('config', nargs='?', default='configValidator.xlsx')
+    export = commands.add_parser('export-pdf', help='convert results written by previous run to PDF by LibreOffice')
+    export.add_argument('config', nargs='?', default='config2026.xlsx')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export-pdf':
+        export_results_pdf(args.config)
+        return
 
-def build_people_list(validator_config_file):
+    if args.command == 'process':
+        if args.incremental and not args.cache_dir:
+            parser.error('--incremental requires --cache-dir')
+        if args.multi_season_birth_years and not args.cache_dir:
+            parser.error('--multi-season-birth-years requires --cache-dir')
+        if args.watch and len(args.config) > 1:
+            parser.error('--watch supports only one config')
+
+    diagnostics.output_format = args.diagnostics
+    sheetRowsCache.directory = args.cache_dir
+    if args.cache_dir:
+        personRegistry.load(args.cache_dir)
+    if args.name_matching != 'difflib':
+        import NameMatching
+        NameMatching.set_backend(args.name_matching)
+    if args.profile or args.trace:
+        profiler.enable()
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    if args.command == 'process' and args.watch:
+        watch_results(args.config[0], args.pdf, args.multi_season_birth_years, args.archive, args.web)
+    elif args.command == 'process':
+        process_seasons(args.config, jobs, args.cache_dir if args.incremental else None, args.pdf,
+                        args.multi_season_birth_years, args.archive, args.web)
+    else:
+        build_people_list(args.config, jobs)
+    personRegistry.save()
+    profiler.print_summary()
+    if args.trace:
+        profiler.write_trace(args.trace)
+
+    repeated = sum(diagnostics.repeated.values())
+    if repeated:
+        info('%d repeated messages were not reported again' % repeated)
+    diagnostics.flush()
+    failed_levels = {'warning': ['warning', 'error'], 'error': ['error']}.get(args.fail_on, [])
+    if any(diagnostics.count(level) for level in failed_levels):
+        sys.exit(1)
+
+
+def export_results_pdf(config_file):
+    # results workbook of the season is converted again, e.g. after manual edits
+    from openpyxl import load_workbook
+    wb = load_workbook(config_file, read_only=True)
+    year = wb['Kategorie']['B1'].value
+    wb.close()
+
+    from ResultWriter import ResultWriter
+    writer = ResultWriter(Config(year, None, []), [])
+    if not os.path.exists(writer.outputFileName):
+        error("Results workbook %s not found, process results first." % writer.outputFileName)
+        diagnostics.flush()
+        sys.exit(1)
+    writer.export_pdf()
+    diagnostics.flush()
+
+
+def build_people_list(validator_config_file, jobs=1):
+    from NameMatching import get_names_matching_ratio
+    from SimilarNamesIndex import SimilarNamesIndex
     validation_config = load_config(validator_config_file)
-    info('Loading old results...')
-    read_results(validation_config, False)
+    progress('Loading old results...')
+    read_results(validation_config, False, jobs)
 
-    info('Building people dir...')
-    people_dir = dict[str, PersonForCheck]()
+    progress('Building people dir...')
+    people_dir = dict[int, PersonForCheck]()
     for category in validation_config.categories:
         sourceYears = build_input_year_list(category)
 
@@ -117,19 +636,21 @@ def build_people_list(validator_config_file):
             resultList = category.results[i]
             for resLine in resultList:
                 p = resLine.person
-                existing = people_dir.get(p.get_key())
+                person_id = p.get_key()
+                existing = people_dir.get(person_id)
                 if not existing:
                     existing = PersonForCheck(p)
-                    people_dir[p.get_key()] = existing
+                    people_dir[person_id] = existing
                 existing.sourceYears.append(sourceYears[i])
 
-    info('Verifying people dir...')
+    progress('Verifying people dir...')
     people_list = list(people_dir.values())
+    names_index = SimilarNamesIndex([p.person.name for p in people_list], 0.9)
     for i in range(len(people_list)):
         pi = people_list[i]
         if not pi.person.birth_year:
             continue
-        for j in range(i + 1, len(people_list)):
+        for j in names_index.get_candidates(i):
             pj = people_list[j]
             if not pj.person.birth_year or abs(pi.person.birth_year - pj.person.birth_year) > 5:
                 # ignore too big differences
@@ -138,7 +659,9 @@ def build_people_list(validator_config_file):
             if ratio > 0.9:
                 warning("Similar names in old results: '%s(%s) [%s]' ~ '%s(%s) [%s]' (%f)"
                         % (pi.person.name, pi.person.birth_year, ', '.join(pi.sourceYears),
-                           pj.person.name, pj.person.birth_year, ', '.join(pj.sourceYears), ratio))
+                           pj.person.name, pj.person.birth_year, ', '.join(pj.sourceYears), ratio),
+                        'similar-names', person=pi.person.name)
+    diagnostics.flush()
 
 
 def build_input_year_list(category):
@@ -146,50 +669,338 @@ def build_input_year_list(category):
     for i in category.inputs:
         m = re.match(r'.*\\(\d{4})\\', i.file_name)
         if not m or not m.group(1):
-            error("Failed to extract year from input file path: '%s'" % i.file_name)
+            error("Failed to extract year from input file path: '%s'" % i.file_name, 'input-year')
         inputYears.append(m.group(1))
     return inputYears
 
 
-def process_results(config_file):
-    config = load_config(config_file)
-    info('Loading results...')
-    read_results(config, True)
-    info('Filling missing birth years...')
-    fill_missing_birth_years(config)
-    info('Counting results...')
-    category_sum_results = extract_summary_results(config)
-    complete_summary_results(category_sum_results, config.max_race_count)
-    info('Checking names...')
-    check_names(category_sum_results)
-    info('Writing output...')
-    writer = ResultWriter(config, category_sum_results)
+def process_seasons(config_files, jobs=1, standings_dir=None, pdf_backend='soffice', multi_season_birth_years=False,
+                    archive_dir=None, web_dir=None):
+    # seasons share caches of workbooks, parsed names and name matching, with more jobs seasons are processed by
+    # worker processes, PDFs by LibreOffice are exported together at the end
+    if len(config_files) == 1:
+        process_results(config_files[0], jobs, standings_dir, pdf_backend, multi_season_birth_years, archive_dir,
+                        web_dir)
+        return
+
+    season_pdf_backend = 'none' if pdf_backend == 'soffice' else pdf_backend
+    years = []
+    if jobs > 1 and len(config_files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(config_files))) as executor:
+            seasons = executor.map(process_season, config_files, repeat(standings_dir), repeat(season_pdf_backend),
+                                   repeat(multi_season_birth_years), repeat(archive_dir), repeat(web_dir),
+                                   repeat(personRegistry.path))
+            # messages are written in order of configs
+            for year, records, new_people, birth_years in seasons:
+                diagnostics.reset_seen()
+                diagnostics.add_records(records)
+                diagnostics.flush()
+                for name, birth_year in new_people:
+                    personRegistry.get_id(name, birth_year)
+                personRegistry.set_season_birth_years(year, birth_years)
+                years.append(year)
+    else:
+        for config_file in config_files:
+            diagnostics.reset_seen()
+            years.append(process_results(config_file, jobs, standings_dir, season_pdf_backend,
+                                         multi_season_birth_years, archive_dir, web_dir))
+
+    if pdf_backend == 'soffice':
+        from ResultWriter import ResultWriter
+        progress('Exporting PDFs...')
+        ResultWriter.export_pdfs([(os.path.abspath("vysledky%s.xlsx" % year), os.path.abspath("VKCT %s.pdf" % year))
+                                  for year in years])
+
+
+def process_season(config_file, standings_dir, pdf_backend, multi_season_birth_years, archive_dir, web_dir,
+                   registry_path):
+    # runs in worker process, returns year, messages, people added to person registry and birth years of season
+    diagnostics.deferred = True
+    # worker process can be reused for more seasons
+    diagnostics.reset_seen()
+    personRegistry.load(os.path.dirname(registry_path) if registry_path else None)
+    stored_count = len(personRegistry.people)
+    year = process_results(config_file, 1, standings_dir, pdf_backend, multi_season_birth_years, archive_dir, web_dir)
+    return year, diagnostics.take_pending(), personRegistry.people[stored_count:], personRegistry.seasons[year]
+
+
+def process_results(config_file, jobs=1, standings_dir=None, pdf_backend='soffice', multi_season_birth_years=False,
+                    archive_dir=None, web_dir=None):
+    with profiler.stage('load_config', config=config_file) as counts:
+        config = load_config(config_file)
+        counts['categories'] = len(config.categories)
+    standings = None
+    stored = dict()
+    if standings_dir:
+        standings = StandingsStore(standings_dir, config_file, config, multi_season_birth_years)
+        for cat in config.categories:
+            entry = standings.get(cat)
+            if entry is not None:
+                stored[cat.name] = entry
+
+    progress('Loading results...')
+    with profiler.stage('read_results', jobs=jobs) as counts:
+        read_results(config._replace(categories=[c for c in config.categories if c.name not in stored]), True, jobs)
+        # birth years of names in categories before filling, stored categories keep them from previous run
+        category_years = {c.name: stored[c.name][1] if c.name in stored else get_category_birth_years(c)
+                          for c in config.categories}
+        season_years = get_season_birth_years(category_years.values())
+        personRegistry.set_season_birth_years(config.year, season_years)
+        # stored categories which filled birth years of names changed in other categories are computed again
+        dependent = [c for c in config.categories
+                     if c.name in stored and not has_same_lookups(stored[c.name][2], season_years, config.year)]
+        if dependent:
+            read_results(config._replace(categories=dependent), True, jobs)
+            for c in dependent:
+                del stored[c.name]
+        changed_config = config._replace(categories=[c for c in config.categories if c.name not in stored])
+        counts['inputs'] = sum(len(c.inputs) for c in changed_config.categories)
+    if standings:
+        progress('Reusing standings of %d unchanged categories...' % len(stored))
+    progress('Filling missing birth years...')
+    with profiler.stage('fill_missing_birth_years'):
+        lookups = fill_missing_birth_years(changed_config, season_years, multi_season_birth_years)
+    progress('Counting results...')
+    with profiler.stage('compute_standings') as counts:
+        computed_results = extract_summary_results(changed_config)
+        complete_summary_results(computed_results, config.max_race_count)
+        counts['people'] = sum(len(c.personal_results) for c in computed_results)
+    computed_iter = iter(computed_results)
+    category_sum_results = [stored[c.name][0] if c.name in stored else next(computed_iter)
+                            for c in config.categories]
+    if standings:
+        for cat_res in computed_results:
+            name = cat_res.category.name
+            standings.put(cat_res, category_years[name], lookups[name])
+        standings.save()
+    progress('Checking names...')
+    with profiler.stage('check_names') as counts:
+        check_names(category_sum_results)
+        counts['people'] = sum(len(c.personal_results) for c in category_sum_results)
+    progress('Writing output...')
+    from ResultWriter import ResultWriter
+    writer = ResultWriter(config, category_sum_results, pdf_backend, web_dir)
     writer.write()
-    info('Done.')
+    if archive_dir:
+        write_archive(archive_dir, config, category_sum_results)
+    progress('Done.')
+    return config.year
 
 
-def fill_missing_birth_years(config):
-    for cat in config.categories:
-        # build map of birth years
-        birth_years = dict[str, Person]()
-        for res in cat.results:
-            for resLine in res:
-                p = resLine.person
-                if p.birth_year is not None and p.name not in birth_years:
-                    birth_years[p.name] = p.birth_year
+def write_archive(archive_dir, config, category_sum_results):
+    # pyarrow is imported only if archive is written
+    import ResultArchive
+    if ResultArchive.pa is None:
+        warning("'pyarrow' package not found — skipping results archive.")
+        return
+    with profiler.stage('write_archive', archive=archive_dir) as counts:
+        path = ResultArchive.write_season(archive_dir, config, category_sum_results)
+        counts['people'] = sum(len(c.personal_results) for c in category_sum_results)
+    info("Results archived: %s" % path, 'output')
 
-        # fill missing birth years
+
+def watch_results(config_file, pdf_backend='soffice', multi_season_birth_years=False, archive_dir=None, web_dir=None):
+    config = load_config(config_file)
+    files = sorted({i.file_name for c in config.categories for i in c.inputs})
+    season = WatchedSeason(config, multi_season_birth_years)
+    mtimes = dict()
+    affected = config.categories
+    write_failed = False
+    while True:
+        start = time.perf_counter()
+        try:
+            mtimes.update((f, os.path.getmtime(f)) for f in files)
+            computed = season.update(affected)
+        except Exception as e:
+            # file is probably still being saved, categories are computed again after next change
+            warning("Failed to read changed results: %s" % e)
+            diagnostics.flush()
+            failed = affected
+        else:
+            failed = []
+            try:
+                from ResultWriter import ResultWriter
+                category_sum_results = season.get_results()
+                ResultWriter(config, category_sum_results, pdf_backend, web_dir).write()
+                if archive_dir:
+                    write_archive(archive_dir, config, category_sum_results)
+            except Exception as e:
+                # output is probably opened in Excel, writing is tried again later
+                warning("Failed to write results: %s. Trying again in %ds." % (e, WATCH_WRITE_RETRY_INTERVAL))
+                diagnostics.flush()
+                write_failed = True
+            else:
+                write_failed = False
+                progress('Results written in %.2fs (%d categories computed again), watching %d files for changes...'
+                         % (time.perf_counter() - start, len(computed), len(files)))
+
+        try:
+            changed_files = wait_for_changes(files, mtimes, WATCH_WRITE_RETRY_INTERVAL if write_failed else None)
+        except KeyboardInterrupt:
+            progress('Watching stopped.')
+            return
+        diagnostics.clear()
+        affected = [c for c in config.categories
+                    if c in failed or any(i.file_name in changed_files for i in c.inputs)]
+
+
+def wait_for_changes(files, mtimes, timeout=None):
+    # returns changed files, after timeout also no file
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        changed = set()
+        for f in files:
+            try:
+                if os.path.getmtime(f) != mtimes.get(f):
+                    changed.add(f)
+            except OSError:
+                # file is replaced by editor
+                pass
+        if changed or (deadline is not None and time.monotonic() >= deadline):
+            return changed
+
+
+sheetFingerprints = dict()
+
+
+def get_sheet_fingerprint(file_name, sheet_name):
+    # changes only if the sheet is changed, not other sheets of the workbook
+    if is_text_input(file_name):
+        return get_input_hash(file_name)
+    path = os.path.abspath(file_name)
+    mtime = os.path.getmtime(path)
+    cached = sheetFingerprints.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = sheetFingerprints[path] = (mtime, get_xlsx_sheet_crcs(path))
+    # unknown sheet or workbook structure, the whole file is compared
+    return cached[1].get(sheet_name) or get_input_hash(file_name)
+
+
+def get_xlsx_sheet_crcs(file_name):
+    # CRCs of sheet parts of xlsx and of parts shared by all sheets (strings and styles),
+    # read from zip directory and workbook part without loading the workbook
+    import posixpath
+    import zipfile
+    from xml.etree import ElementTree
+    with zipfile.ZipFile(file_name) as z:
+        crcs = {i.filename: i.CRC for i in z.infolist()}
+        workbook = ElementTree.fromstring(z.read('xl/workbook.xml'))
+        relationships = ElementTree.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+    targets = {r.get('Id'): r.get('Target') for r in relationships}
+    shared_crcs = crcs.get('xl/sharedStrings.xml'), crcs.get('xl/styles.xml')
+    sheets = dict()
+    for sheet in workbook.iter():
+        if not sheet.tag.endswith('}sheet'):
+            continue
+        # relationship id is the only 'id' attribute of sheet element (in namespace of relationships)
+        target = next((targets.get(v) for k, v in sheet.attrib.items() if k.endswith('}id')), None)
+        if not target:
+            continue
+        part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+        if part in crcs:
+            sheets[sheet.get('name')] = (crcs[part],) + shared_crcs
+    return sheets
+
+
+def get_category_birth_years(category):
+    # birth years of names in category (in order of first occurrence), before missing ones are filled
+    birth_years = dict()
+    for res in category.results:
+        for resLine in res:
+            p = resLine.person
+            if p.birth_year is not None:
+                birth_years.setdefault(p.name, dict()).setdefault(p.birth_year)
+    return {name: tuple(years) for name, years in birth_years.items()}
+
+
+def get_season_birth_years(category_years):
+    # sorted birth years of names in all categories
+    season_years = dict()
+    for birth_years in category_years:
+        for name, years in birth_years.items():
+            season_years.setdefault(name, set()).update(years)
+    return {name: tuple(sorted(years)) for name, years in season_years.items()}
+
+
+def fill_missing_birth_years(config, season_years=None, use_registry=False):
+    # year from the same category is preferred, years from other categories of season (all categories of config
+    # by default) and from person registry must be unambiguous,
+    # returns (source, name, birth years) looked up outside of category for each category
+    if season_years is None:
+        season_years = get_season_birth_years(get_category_birth_years(c) for c in config.categories)
+    reported = set()
+    lookups = dict()
+    for cat in config.categories:
+        cat_years = get_category_birth_years(cat)
+        cat_lookups = set()
         for res in cat.results:
             for resLine in res:
                 p = resLine.person
-                if p.birth_year is None and p.name in birth_years:
-                    p.birth_year = birth_years[p.name]
+                if p.birth_year is not None:
+                    continue
+                years = cat_years.get(p.name)
+                if years:
+                    p.birth_year = years[0]
+                    if len(years) > 1 and (cat.name, p.name) not in reported:
+                        reported.add((cat.name, p.name))
+                        warning("Conflicting birth years of '%s' in category '%s': %s. Using %d."
+                                % (p.name, cat.name, format_years(years), p.birth_year), 'birth-year-conflict',
+                                person=p.name)
+                    continue
+
+                # years out of age range of category belong to other people of the same name
+                for source in ('season', 'registry') if use_registry else ('season',):
+                    if source == 'season':
+                        years = season_years.get(p.name, ())
+                    else:
+                        years = get_registry_years(p.name, config.year)
+                    cat_lookups.add((source, p.name, years))
+                    in_range = [y for y in years if cat.min_year <= y <= cat.max_year]
+                    source_name = 'season' if source == 'season' else 'other seasons'
+                    if len(in_range) < len(years) and (cat.name, p.name, source) not in reported:
+                        reported.add((cat.name, p.name, source))
+                        warning("Birth years of '%s' in %s out of age range of category '%s' (%d-%d) not used: %s."
+                                % (p.name, source_name, cat.name, cat.min_year, cat.max_year,
+                                   format_years(y for y in years if y not in in_range)),
+                                'birth-year-out-of-range', person=p.name)
+                    if not in_range:
+                        continue
+                    if len(in_range) == 1:
+                        p.birth_year = in_range[0]
+                    elif (cat.name, p.name) not in reported:
+                        reported.add((cat.name, p.name))
+                        warning("Conflicting birth years of '%s' in %s: %s. Birth year in category '%s' not filled."
+                                % (p.name, source_name, format_years(in_range), cat.name), 'birth-year-conflict',
+                                person=p.name)
+                    break
+        lookups[cat.name] = tuple(sorted(cat_lookups))
+    return lookups
+
+
+def has_same_lookups(lookups, season_years, season):
+    # birth years looked up outside of category are the same as when the category was computed
+    return all((season_years.get(name, ()) if source == 'season' else get_registry_years(name, season)) == years
+               for source, name, years in lookups)
+
+
+def get_registry_years(name, season):
+    # birth years of name in other seasons stored in person registry, in comparable form
+    return tuple(sorted(personRegistry.get_birth_years(name, season)))
+
+
+def format_years(years):
+    return ', '.join(str(y) for y in sorted(years))
 
 
 def check_names(category_sum_results):
+    from NameMatching import get_names_matching_ratio
+    from SimilarNamesIndex import SimilarNamesIndex
     for cat_results in category_sum_results:
+        names_index = SimilarNamesIndex([pr.person.name for pr in cat_results.personal_results], 0.8)
         for i in range(len(cat_results.personal_results)):
-            for j in range(i + 1, len(cat_results.personal_results)):
+            for j in names_index.get_candidates(i):
                 pi = cat_results.personal_results[i]
                 pj = cat_results.personal_results[j]
                 ratio = get_names_matching_ratio(pi.person.name, pj.person.name)
@@ -197,25 +1008,12 @@ def check_names(category_sum_results):
                     warning("Similar names in category '%s': '%s(%s) [%s]' ~ '%s(%s) [%s]' (%f)"
                             % (cat_results.category.name,
                                pi.person.name, pi.person.birth_year, get_race_index_list(pi),
-                               pj.person.name, pj.person.birth_year, get_race_index_list(pj), ratio))
+                               pj.person.name, pj.person.birth_year, get_race_index_list(pj), ratio),
+                            'similar-names', person=pi.person.name)
                 pass
         pass
 
 
-def get_names_matching_ratio(name_a, name_b):
-    parts_a = name_a.split()
-
-    res = 0
-    if len(parts_a) < len(name_b.split()):
-        return get_names_matching_ratio(name_b, name_a)
-    if len(parts_a) == 3:
-        res = max(
-            difflib.SequenceMatcher(a="%s %s" % (parts_a[0], parts_a[2]), b=name_b).ratio(),
-            difflib.SequenceMatcher(a="%s %s" % (parts_a[1], parts_a[2]), b=name_b).ratio()
-        )
-    return max(res, difflib.SequenceMatcher(a=name_a, b=name_b).ratio())
-
-
 def get_race_index_list(personal_results):
     result = []
     for i in range(len(personal_results.race_results)):
@@ -224,7 +1022,11 @@ def get_race_index_list(personal_results):
     return ', '.join(result)
 
 
-def read_results(config, validate_values: bool):
+def read_results(config, validate_values: bool, jobs=1):
+    if jobs > 1:
+        read_results_parallel(config, validate_values, jobs)
+        return
+
     for cat in config.categories:
         for i in cat.inputs:
             res = read_result_sheet(i.file_name, i.sheet_name, i.first_row, i.name_col, i.name2_col, i.team_col,
@@ -232,6 +1034,73 @@ def read_results(config, validate_values: bool):
             cat.results.append(res)
 
 
+def read_results_parallel(config, validate_values: bool, jobs):
+    # group distinct not cached inputs by file, every file is parsed by one worker
+    sheet_rows = dict()
+    file_inputs = dict()
+    for cat in config.categories:
+        for i in cat.inputs:
+            if i in sheet_rows:
+                continue
+            rows = sheetRowsCache.get(i.file_name, get_sheet_key(i, validate_values))
+            if rows is not None:
+                sheet_rows[i] = rows
+                continue
+            inputs = file_inputs.setdefault(i.file_name, [])
+            if i not in inputs:
+                inputs.append(i)
+
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        file_rows = executor.map(read_file_sheet_rows, file_inputs.keys(), file_inputs.values(),
+                                 repeat(validate_values))
+        for file_name, inputs, (rows_list, timing) in zip(file_inputs.keys(), file_inputs.values(), file_rows):
+            profiler.add('read_file_sheet_rows', *timing, file=file_name, sheets=len(inputs))
+            for i, rows in zip(inputs, rows_list):
+                sheet_rows[i] = rows
+                if rows is not None:
+                    sheetRowsCache.put(i.file_name, get_sheet_key(i, validate_values), rows)
+
+    # normalize in the original order to keep order of messages
+    for cat in config.categories:
+        for i in cat.inputs:
+            rows = sheet_rows[i]
+            if rows is None:
+                error("Failed to get sheet '%s' from %s" % (i.sheet_name, i.file_name), 'missing-sheet')
+                raise KeyError(i.sheet_name)
+            with profiler.stage('normalize_sheet_rows', file=i.file_name, sheet=i.sheet_name) as counts:
+                res = normalize_sheet_rows(rows, i.file_name, i.sheet_name, i.is_alternative, cat, validate_values)
+                counts['rows'] = len(res)
+            cat.results.append(res)
+
+
+def get_sheet_key(category_input, read_styles):
+    # key of parsed rows in sheet cache, shared by sequential and parallel reading
+    i = category_input
+    return i.sheet_name, i.first_row, i.name_col, i.name2_col, i.team_col, i.birth_year_col, i.pos_col, read_styles
+
+
+def read_file_sheet_rows(file_name, inputs, read_styles):
+    # runs in worker process, returns only picklable rows (None for missing sheet) and timing for profiler
+    start = time.time()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    wb = load_input_workbook(file_name)
+    try:
+        result = []
+        for i in inputs:
+            try:
+                ws = wb[i.sheet_name]
+            except KeyError:
+                result.append(None)
+                continue
+            result.append(list(read_sheet_rows(ws, i.first_row, i.name_col, i.name2_col, i.team_col,
+                                               i.birth_year_col, i.pos_col, read_styles)))
+    finally:
+        wb.close()
+    return result, (start, time.perf_counter() - wall, time.process_time() - cpu, os.getpid())
+
+
 def extract_summary_results(config):
     category_sum_results = []
     for cat in config.categories:
@@ -239,17 +1108,20 @@ def extract_summary_results(config):
         res_map = {}
         category_sum_results.append(cat_res)
         race_idx = -1
+        race_count = cat.get_race_count()
         for i in range(0, len(cat.results)):
             race_results = cat.results[i]
 
             if not cat.inputs[i].is_alternative:
                 race_idx = race_idx + 1
 
-            for res_line in race_results:
+            race_points = compute_race_points(len(race_results), [ln.position for ln in race_results],
+                                              cat.inputs[i].is_alternative, cat.count_positions)
+            for res_line, points in zip(race_results, race_points):
                 key = res_line.person.get_key()
                 pr = res_map.get(key)
                 if pr is None:
-                    res_map[key] = pr = PersonalResults(res_line.person, cat.get_race_count())
+                    res_map[key] = pr = PersonalResults(res_line.person, race_count)
                 elif pr.person.team is None and res_line.person.team is not None:
                     # fix missing team if present
                     pr.person = Person(pr.person.name, res_line.person.team, pr.person.birth_year)
@@ -257,8 +1129,7 @@ def extract_summary_results(config):
                 rr = pr.race_results[race_idx]
                 rr.position = res_line.position
 
-                rr.points = compute_points(len(race_results), res_line.position, res_line.is_alternative,
-                                           cat.count_positions)
+                rr.points = points
                 rr.half_points = res_line.is_alternative
 
         cat_res.personal_results = list(res_map.values())
@@ -288,19 +1159,32 @@ def compute_points(people_count, position, half_points, count_positions):
     return p
 
 
+def compute_race_points(people_count, positions, half_points, count_positions):
+    # points of all positions of one race, points of scored positions are computed once per race
+    table = [compute_points(people_count, p, half_points, count_positions) for p in range(1, len(point_table) + 1)]
+    return [table[p - 1] if isinstance(p, int) and 1 <= p <= len(table)
+            else compute_points(people_count, p, half_points, count_positions)
+            for p in positions]
+
+
 def mark_ignored_results(race_results: list[RaceResult], max_race_count: int):
     sorted_results = sorted(race_results, key=lambda rr_: get_nullable_as_int(rr_.points), reverse=True)[max_race_count:]
     for rr in sorted_results:
         rr.ignored_in_summary = True
 
 
-def sum_race_results(race_results: list[RaceResult], max_race_count: int):
-    sorted_results = sorted(race_results, key=lambda rr_: get_nullable_as_int(rr_.points), reverse=True)[:max_race_count]
-    res = None
-    for rr in sorted_results:
+def compute_sum_points(race_results: list[RaceResult], max_race_count):
+    # running sum of max_race_count best points kept in min-heap, None means no limit
+    best_points = []
+    sum_points = None
+    for rr in race_results:
         if rr.points is not None:
-            res = rr.points if res is None else res + rr.points
-    return res
+            if max_race_count is None or len(best_points) < max_race_count:
+                heapq.heappush(best_points, rr.points)
+                sum_points = rr.points if sum_points is None else sum_points + rr.points
+            elif best_points and rr.points > best_points[0]:
+                sum_points += rr.points - heapq.heapreplace(best_points, rr.points)
+        rr.sum_points = sum_points
 
 
 def complete_summary_results(category_sum_results, max_race_count: int):
@@ -312,11 +1196,10 @@ def complete_summary_results(category_sum_results, max_race_count: int):
         for pr in cat_results.personal_results:
             if cat_results.category.count_positions:
                 mark_ignored_results(pr.race_results, max_race_count)
-
-            for i in range(0, len(pr.race_results)):
+                compute_sum_points(pr.race_results, max_race_count)
+            else:
                 # don't limit max race count for categories without counting of positions
-                max_ = max_race_count if cat_results.category.count_positions else i + 1
-                pr.race_results[i].sum_points = sum_race_results(pr.race_results[:i + 1], max_)
+                compute_sum_points(pr.race_results, None)
 
         race_count = cat_results.category.get_race_count()
         # sort by first column if there is only one race
@@ -325,17 +1208,27 @@ def complete_summary_results(category_sum_results, max_race_count: int):
 
         # complete sum_position
         for i in range(1, race_count):
-            cat_results.personal_results = sorted(cat_results.personal_results, key=lambda pr_: get_nullable_as_int(pr_.race_results[i].sum_points), reverse=True)
-            sum_pos = 1
-            last_sum_points = None
-            last_sum_position = None
-            for pr in cat_results.personal_results:
-                if pr.race_results[i].sum_points == last_sum_points:
-                    pr.race_results[i].sum_position = last_sum_position
-                else:
-                    last_sum_points = pr.race_results[i].sum_points
-                    pr.race_results[i].sum_position = last_sum_position = sum_pos
-                sum_pos = sum_pos + 1
+            complete_sum_positions(cat_results.personal_results, i)
+
+        # sort by sum_points of last race, ties by previous races and then by order of results
+        if race_count > 1:
+            cat_results.personal_results = sorted(
+                cat_results.personal_results, reverse=True,
+                key=lambda pr_: [get_nullable_as_int(pr_.race_results[i].sum_points) for i in range(race_count - 1, 0, -1)])
+
+
+def complete_sum_positions(personal_results: list[PersonalResults], race_idx: int):
+    # people with equal sum_points share position
+    counts = Counter(get_nullable_as_int(pr.race_results[race_idx].sum_points) for pr in personal_results)
+    positions = dict()
+    sum_pos = 1
+    for sum_points in sorted(counts, reverse=True):
+        # no position in race without any sum_points yet
+        positions[sum_points] = sum_pos if sum_pos > 1 or sum_points != get_nullable_as_int(None) else None
+        sum_pos = sum_pos + counts[sum_points]
+
+    for pr in personal_results:
+        pr.race_results[race_idx].sum_position = positions[get_nullable_as_int(pr.race_results[race_idx].sum_points)]
 
 
 def get_nullable_as_int(sum_points):
@@ -345,6 +1238,7 @@ def get_nullable_as_int(sum_points):
 
 
 def load_config(config_file):
+    from openpyxl import load_workbook
     wb = load_workbook(config_file)
     ws = wb['Kategorie']
 
@@ -397,41 +1291,75 @@ def get_column_index(col_name):
 
 def read_result_sheet(file_name, sheet_name, first_row, name_col, name2_col, team_col, birth_year_col, pos_col,
                       is_alternative, category, validate_values: bool):
-    wb = load_workbook(file_name)
-    try:
-        ws = wb[sheet_name]
-    except Exception:
-        error("Failed to get sheet '%s' from %s" % (sheet_name, file_name))
-        raise
+    with profiler.stage('read_result_sheet', file=file_name, sheet=sheet_name) as counts:
+        lines = read_result_sheet_lines(file_name, sheet_name, first_row, name_col, name2_col, team_col,
+                                        birth_year_col, pos_col, is_alternative, category, validate_values)
+        counts['rows'] = len(lines)
+    return lines
 
-    parsePosition.file = file_name
-    parsePosition.sheet = sheet_name
 
-    lines = []
+def read_result_sheet_lines(file_name, sheet_name, first_row, name_col, name2_col, team_col, birth_year_col, pos_col,
+                            is_alternative, category, validate_values: bool):
+    # styles are needed only for approval marks checked by validation
+    sheet_key = get_sheet_key(CategoryInput(file_name, sheet_name, first_row, name_col, name2_col, team_col,
+                                            birth_year_col, pos_col, is_alternative), validate_values)
+    rows = sheetRowsCache.get(file_name, sheet_key)
+    if rows is None:
+        try:
+            ws = workbookCache.get_sheet(file_name, sheet_name)
+        except Exception:
+            error("Failed to get sheet '%s' from %s" % (sheet_name, file_name), 'missing-sheet')
+            raise
+
+        rows = read_sheet_rows(ws, first_row, name_col, name2_col, team_col, birth_year_col, pos_col, validate_values)
+        if sheetRowsCache.directory:
+            rows = list(rows)
+            sheetRowsCache.put(file_name, sheet_key, rows)
+
+    return normalize_sheet_rows(rows, file_name, sheet_name, is_alternative, category, validate_values)
+
+
+SheetRow = namedtuple("SheetRow", "row, name, team, birth_year, approved_birth_year, pos, approved_pos")
+
+
+def read_sheet_rows(ws, first_row, name_col, name2_col, team_col, birth_year_col, pos_col, read_styles):
+    # only columns used by the input are read, cells with styles are created only if read_styles is set
+    used_cols = [c for c in (name_col, name2_col, team_col, birth_year_col, pos_col) if c]
+    min_col = min(used_cols)
+    name_idx, name2_idx, team_idx, birth_year_idx, pos_idx = [
+        c - min_col if c else None for c in (name_col, name2_col, team_col, birth_year_col, pos_col)]
+
     row = first_row
-    while True:
-        parsePosition.row = row
-        name_val = ws.cell(row=row, column=name_col).value
+    for cells in ws.iter_rows(min_row=first_row, min_col=min_col, max_col=max(used_cols), values_only=not read_styles):
+        values = [c.value for c in cells] if read_styles else cells
+        name_val = values[name_idx]
         if not name_val or name_val.isspace():
             break
 
-        if name2_col:
-            name_val = name_val + ' ' + ws.cell(row=row, column=name2_col).value
+        if name2_idx is not None:
+            name_val = name_val + ' ' + values[name2_idx]
+
+        yield SheetRow(row, name_val, get_projected_value(values, team_idx),
+                       get_projected_value(values, birth_year_idx),
+                       read_styles and birth_year_idx is not None and has_approved_value(cells[birth_year_idx]),
+                       get_projected_value(values, pos_idx),
+                       read_styles and pos_idx is not None and has_approved_value(cells[pos_idx]))
+        row = row + 1
 
-        birth_year_cell = ws.cell(row=row, column=birth_year_col)
-        position_cell = ws.cell(row=row, column=pos_col)
-        line = create_normalized_result_line(
-            name_val,
-            ws.cell(row=row, column=team_col).value,
-            birth_year_cell.value, has_approved_value(birth_year_cell),
-            position_cell.value, has_approved_value(position_cell),
-            is_alternative, category, validate_values)
 
+def get_projected_value(values, idx):
+    return values[idx] if idx is not None else None
+
+
+def normalize_sheet_rows(rows, file_name, sheet_name, is_alternative, category, validate_values: bool):
+    lines = []
+    for r in rows:
+        line = create_normalized_result_line(r.name, r.team, r.birth_year, r.approved_birth_year,
+                                             r.pos, r.approved_pos, is_alternative, category, validate_values,
+                                             SourcePosition(file_name, sheet_name, r.row))
         if line is not None:
             lines.append(line)
-        row = row + 1
 
-    parsePosition.file = None
     if validate_values:
         validate_positions(lines, sheet_name, file_name, is_alternative)
     return lines
@@ -456,7 +1384,8 @@ def validate_positions(lines: list[ResultLine], sheet_name, file_name, is_altern
         if not ln.position or ln.position in DNF_ACRONYMS:
             continue
         if not ln.approved_pos and ln.position in pos_dir.keys():
-            error("Non-unique position '%s' in sheet '%s' of %s. " % (ln.position, sheet_name, file_name))
+            error("Non-unique position '%s' in sheet '%s' of %s. " % (ln.position, sheet_name, file_name),
+                  'duplicate-position', person=ln.person.name)
         else:
             pos_dir[ln.position] = ln
 
@@ -464,19 +1393,22 @@ def validate_positions(lines: list[ResultLine], sheet_name, file_name, is_altern
         # check missing positions
         for i in range(1, len(pos_dir) + 1):
             if i not in pos_dir.keys():
-                error("Missing position '%s' in sheet '%s' of %s. " % (i, sheet_name, file_name))
+                error("Missing position '%s' in sheet '%s' of %s. " % (i, sheet_name, file_name), 'missing-position')
 
 
 def has_approved_value(cell):
+    if cell.font is None:
+        return False
     return cell.font.b and cell.font.i and cell.font.u == 'single'
 
 
-def create_normalized_result_line(name, team, birth_year, approved_birth_year, pos, approved_pos, is_alternative, category, validate_values: bool):
-    n_name = normalize_name(name)
+def create_normalized_result_line(name, team, birth_year, approved_birth_year, pos, approved_pos, is_alternative, category, validate_values: bool,
+                                  position=None):
+    n_name = normalize_name(name, position)
 
     birth_year = to_int(birth_year)
     if not isinstance(birth_year, int):
-        warning("Birth year '%s' of %s is not a number" % (birth_year, name))
+        warning("Birth year '%s' of %s is not a number" % (birth_year, name), 'birth-year-not-number', position, n_name)
     elif birth_year == -1:
         birth_year = None
     elif validate_values and (birth_year < category.min_year or birth_year > category.max_year):
@@ -487,11 +1419,12 @@ def create_normalized_result_line(name, team, birth_year, approved_birth_year, p
                 return None
             else:
                 warning("Person '%s' (%d) is out of category age range %s (%d-%d). If you are sure, then make input field underlined, bold & italic."
-                        % (name, birth_year, category.name, category.min_year, category.max_year))
+                        % (name, birth_year, category.name, category.min_year, category.max_year),
+                        'out-of-age-range', position, n_name)
 
     n_pos = to_int(pos)
     if not isinstance(n_pos, int) and n_pos not in DNF_ACRONYMS:
-        info("Position '%s' is not a number! DNF '%s'!" % (n_pos, n_name))
+        info("Position '%s' is not a number! DNF '%s'!" % (n_pos, n_name), 'position-not-number', position, n_name)
         n_pos = 'DNF'
 
     return ResultLine(Person(n_name, team, birth_year), n_pos, approved_pos, is_alternative)
@@ -508,66 +1441,129 @@ def to_int(n):
     return n
 
 
-def normalize_name(src):
-    parts = src.replace('Mgr.', '').replace('Ing.', '').replace('ml.', '').replace('st.', '').strip().split()
+def normalize_name(src, position=None):
+    name, report = parse_name(src)
+    if report is not None:
+        report(name, position)
+    return name
+
+
+# names repeat in all categories and seasons, so result of the name detection is cached,
+# problems are returned instead of reported to be reported at every occurrence
+@lru_cache(maxsize=1 << 16)
+def parse_name(src):
+    first_names = get_first_names()
+    parts = NAME_TITLES_RE.sub('', src).split()
     if len(parts) == 2:
         n1 = parts[0].capitalize()
         n2 = parts[1].capitalize()
-        if n1 in first_names and n2 not in first_names:
-            return "%s %s" % (n1, n2)
-        if n2 in first_names and n1 not in first_names:
-            return "%s %s" % (n2, n1)
+        n1_first = n1 in first_names
+        n2_first = n2 in first_names
+        if n1_first and not n2_first:
+            return "%s %s" % (n1, n2), None
+        if n2_first and not n1_first:
+            return "%s %s" % (n2, n1), None
         if "%s_%s" % (n1, n2) in first_names:
-            return "%s %s" % (n1, n2)
+            return "%s %s" % (n1, n2), None
         if "%s_%s" % (n2, n1) in first_names:
-            return "%s %s" % (n2, n1)
-        warning("Unable to detect first and second name: '%s'" % src)
-        return src
+            return "%s %s" % (n2, n1), None
+        return src, report_undetected_name
     if len(parts) == 3:
         n1 = parts[0].capitalize()
         n2 = parts[1].capitalize()
         n3 = parts[2].capitalize()
-        if n1 in first_names and n2 in first_names and n3 not in first_names:
-            return "%s %s %s" % (n1, n2, n3)
-        if n1 not in first_names and n2 in first_names and n3 in first_names:
-            return "%s %s %s" % (n2, n3, n1)
+        n1_first = n1 in first_names
+        n2_first = n2 in first_names
+        n3_first = n3 in first_names
+        if n1_first and n2_first and not n3_first:
+            return "%s %s %s" % (n1, n2, n3), None
+        if not n1_first and n2_first and n3_first:
+            return "%s %s %s" % (n2, n3, n1), None
         if "%s_%s_%s" % (n1, n2, n3) in first_names:
-            return "%s %s %s" % (n1, n2, n3)
+            return "%s %s %s" % (n1, n2, n3), None
         if "%s_%s_%s" % (n2, n3, n1) in first_names:
-            return "%s %s %s" % (n2, n3, n1)
+            return "%s %s %s" % (n2, n3, n1), None
 
-    error("Unexpected name format, 2 parts expected: '%s'" % src)
-    return src
+    return src, report_unexpected_name
 
 
-def info(msg):
-    message("INFO: ", msg)
+def report_undetected_name(src, position):
+    warning("Unable to detect first and second name: '%s'" % src, 'undetected-first-name', position, src)
 
 
-def warning(msg):
-    message("WARNING: ", msg)
+def report_unexpected_name(src, position):
+    error("Unexpected name format, 2 parts expected: '%s'" % src, 'unexpected-name-format', position, src)
 
 
-def error(msg):
-    message("ERROR: ", msg)
+def progress(msg):
+    # messages of finished stage are written together with the stage progress
+    info(msg, 'progress')
+    diagnostics.flush()
 
 
-def message(prefix, msg):
-    if parsePosition.file:
-        print("%s%s @%s[%s]:%d" % (prefix, msg, parsePosition.file, parsePosition.sheet, parsePosition.row))
-    else:
-        print("%s%s" % (prefix, msg))
+def info(msg, code=None, position=None, person=None):
+    diagnostics.add('info', msg, code, position, person)
+
+
+def warning(msg, code=None, position=None, person=None):
+    diagnostics.add('warning', msg, code, position, person)
+
+
+def error(msg, code=None, position=None, person=None):
+    diagnostics.add('error', msg, code, position, person)
 
 
 def load_first_names():
+    # parsed names are stored next to the text file and parsed again only if the file changes
+    stat = os.stat(FIRST_NAMES_FILE)
+    key = (FIRST_NAMES_INDEX_VERSION, stat.st_mtime_ns, stat.st_size)
+    try:
+        with open(FIRST_NAMES_INDEX_FILE, 'rb') as f:
+            stored_key, names = pickle.load(f)
+        if stored_key == key:
+            return names
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        pass
+
     res = {""}
-    for l in open('firstNames.txt', encoding="utf8").read().split():
+    for l in open(FIRST_NAMES_FILE, encoding="utf8").read().split():
         res.add(l)
-    return res
+    names = frozenset(res)
+    try:
+        # workers of process pool may load the names concurrently
+        tmp_file = '%s.%d.tmp' % (FIRST_NAMES_INDEX_FILE, os.getpid())
+        with open(tmp_file, 'wb') as f:
+            pickle.dump((key, names), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, FIRST_NAMES_INDEX_FILE)
+    except OSError as e:
+        warning("Unable to store first names index %s: %s" % (FIRST_NAMES_INDEX_FILE, e), 'broken-cache')
+    return names
 
 
 DNF_ACRONYMS = ['DNF', 'DNP', 'DNS']
-
-first_names = load_first_names()
-
-main()
+# extensions of text inputs, delimiter of .csv is detected
+TEXT_INPUT_DELIMITERS = {'.csv': None, '.tsv': '\t'}
+INT_VALUE_RE = re.compile(r'-?\d+$')
+FLOAT_VALUE_RE = re.compile(r'-?\d+\.\d+$')
+CELL_REFERENCE_RE = re.compile(r'\b([A-Z]{1,3})(\d+)\b')
+# seconds between checks of changed input files in watch mode
+WATCH_INTERVAL = 0.5
+# seconds between attempts to write results which failed to be written
+WATCH_WRITE_RETRY_INTERVAL = 5
+FIRST_NAMES_FILE = 'firstNames.txt'
+FIRST_NAMES_INDEX_FILE = 'firstNames.pickle'
+FIRST_NAMES_INDEX_VERSION = 1
+# academic titles and junior/senior suffixes, matched only at start of a word
+NAME_TITLES_RE = re.compile(r'\b(?:Mgr|Ing|ml|st)\.')
+
+first_names = None
+
+
+def get_first_names():
+    global first_names
+    if first_names is None:
+        first_names = load_first_names()
+    return first_names
+
+if __name__ == '__main__':
+    main()
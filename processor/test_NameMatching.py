@@ -0,0 +1,85 @@
+import difflib
+import random
+import unittest
+
+import NameMatching
+
+NAMES = ['Novák Jan', 'Nováková Jana', 'Novak Jan', 'Svoboda Petr', 'Svobodová Petra', 'Dvořák Karel',
+         'Dvorak Karel', 'Černý Tomáš', 'Černá Tereza', 'Procházka Jiří', 'Procházková Eliška', 'Mana Tomáš',
+         'Man Tomáš', 'Kučera Jan Pavel', 'Kučera Pavel', 'Kučera Jan', 'Veselý Josef Marie', 'Veselý Josef',
+         'Horák Vojtěch', 'Horáková Marie Anna', 'Marek Adam', 'Adam Marek', 'Nguyen Van Anh', 'Van Anh']
+
+
+# original implementation, which is replaced by NameMatching
+def reference_ratio(name_a, name_b):
+    parts_a = name_a.split()
+
+    res = 0
+    if len(parts_a) < len(name_b.split()):
+        return reference_ratio(name_b, name_a)
+    if len(parts_a) == 3:
+        res = max(
+            difflib.SequenceMatcher(a="%s %s" % (parts_a[0], parts_a[2]), b=name_b).ratio(),
+            difflib.SequenceMatcher(a="%s %s" % (parts_a[1], parts_a[2]), b=name_b).ratio()
+        )
+    return max(res, difflib.SequenceMatcher(a=name_a, b=name_b).ratio())
+
+
+def get_name_pairs():
+    # names with typos, so pairs around thresholds are covered
+    rnd = random.Random(1)
+    names = list(NAMES)
+    for name in NAMES:
+        for _ in range(3):
+            i = rnd.randrange(len(name))
+            names.append(name[:i] + rnd.choice('aeiouyáé') + name[i + 1:])
+    return [(a, b) for a in names for b in names]
+
+
+class NameMatchingTest(unittest.TestCase):
+    def setUp(self):
+        NameMatching.set_backend('difflib')
+
+    def tearDown(self):
+        NameMatching.set_backend('difflib')
+
+    def test_difflib_parity(self):
+        for a, b in get_name_pairs():
+            self.assertEqual(NameMatching.get_names_matching_ratio(a, b), reference_ratio(a, b), (a, b))
+
+    def test_swapped_arguments(self):
+        # name with more parts is always the one with variants, so the order of arguments doesn't matter
+        for a, b in get_name_pairs():
+            if len(a.split()) != len(b.split()):
+                self.assertEqual(NameMatching.get_names_matching_ratio(a, b),
+                                 NameMatching.get_names_matching_ratio(b, a), (a, b))
+                self.assertEqual(NameMatching.get_names_matching_ratio(b, a), reference_ratio(b, a), (b, a))
+
+    def test_three_part_names(self):
+        for a, b in [('Kučera Jan Pavel', 'Kučera Pavel'), ('Kučera Jan Pavel', 'Kučera Jan'),
+                     ('Kučera Pavel', 'Kučera Jan Pavel'), ('Veselý Josef Marie', 'Veselý Josef'),
+                     ('Nguyen Van Anh', 'Van Anh'), ('Horáková Marie Anna', 'Horákova Anna')]:
+            self.assertEqual(NameMatching.get_names_matching_ratio(a, b), reference_ratio(a, b), (a, b))
+        self.assertEqual(NameMatching.get_names_matching_ratio('Kučera Jan Pavel', 'Kučera Pavel'), 1.0)
+
+    def test_thresholds(self):
+        # similar names are reported in categories above 0.8 and by people validation above 0.9
+        for threshold in (0.8, 0.9):
+            over = [(a, b) for a, b in get_name_pairs() if reference_ratio(a, b) > threshold]
+            self.assertTrue(over)
+            for a, b in get_name_pairs():
+                self.assertEqual(NameMatching.get_names_matching_ratio(a, b) > threshold,
+                                 reference_ratio(a, b) > threshold, (a, b, threshold))
+
+    def test_rapidfuzz_is_not_lower(self):
+        # SimilarNamesIndex relies on the rapidfuzz ratio being at least the difflib one
+        try:
+            NameMatching.set_backend('rapidfuzz')
+        except ValueError:
+            self.skipTest('rapidfuzz is not installed')
+        for a, b in get_name_pairs():
+            self.assertGreaterEqual(NameMatching.get_names_matching_ratio(a, b) + 1e-9, reference_ratio(a, b), (a, b))
+
+
+if __name__ == '__main__':
+    unittest.main()
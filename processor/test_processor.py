@@ -0,0 +1,35 @@
+import random
+import unittest
+
+import processor
+
+PEOPLE_COUNTS = [0, 1, 2, 5, 29, 30, 31, 45, 60, 89, 120]
+POSITIONS = list(range(-3, 90)) + processor.DNF_ACRONYMS
+
+
+class ComputeRacePointsTest(unittest.TestCase):
+    def assert_equal_to_scalar(self, people_count, positions, half_points, count_positions):
+        self.assertEqual(processor.compute_race_points(people_count, positions, half_points, count_positions),
+                         [processor.compute_points(people_count, p, half_points, count_positions) for p in positions],
+                         (people_count, half_points, count_positions))
+
+    def test_all_positions(self):
+        for people_count in PEOPLE_COUNTS:
+            for half_points in (False, True):
+                for count_positions in (False, True):
+                    self.assert_equal_to_scalar(people_count, POSITIONS, half_points, count_positions)
+
+    def test_random_races(self):
+        # races in order of input rows, positions can repeat and be missing
+        rnd = random.Random(1)
+        for _ in range(500):
+            positions = [rnd.choice(POSITIONS) for _ in range(rnd.randint(0, 80))]
+            self.assert_equal_to_scalar(rnd.choice(PEOPLE_COUNTS + [len(positions)]), positions,
+                                        rnd.random() < 0.5, rnd.random() < 0.8)
+
+    def test_empty_race(self):
+        self.assertEqual(processor.compute_race_points(0, [], False, True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()